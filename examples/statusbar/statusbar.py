@@ -7,38 +7,41 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "uxceptional"))
 from pathlib import Path
 
-import glfw
 import imgui
 
 import uxceptional.apputils as utils
-from uxceptional import (Backend, DataFetcher, Direction, MonitorPreference,
-                         ShellWindow, WindowBase)
+import uxceptional.sources as sources
+from uxceptional import (Backend, DataCache, Direction, MonitorPreference,
+                         ShellWindow, StreamFetcher, Theme, WindowBase)
+
+THEME = Theme(palette={"playing": "#50fa7b"})
 
 
 class DataSource:
     """
     Async data sources
     """
-    async def time(data):
-        result = await utils.run_async("date")
-        return result.stdout.strip()
-    
-    async def spotify(data):
-        playerctl_status = await utils.run_async("playerctl status -p spotify", shell=True)
-        if playerctl_status.returncode != 0:
-            return {
-                "state": "Stopped",
-                "title": "spotify not running",
-            }
-
-        playing = await utils.run_async(
-            "playerctl metadata -p spotify --format '{{ artist }} - {{ title }}'",
-            shell=True,
-        )
+    # playerctl prints a line whenever the player state changes
+    # and an empty line when the player goes away
+    SPOTIFY_COMMAND = [
+        "playerctl", "metadata", "-p", "spotify", "--follow",
+        "--format", "{{ status }}\t{{ artist }} - {{ title }}",
+    ]
+
+    async def spotify_stopped(data):
+        return {
+            "state": "Stopped",
+            "title": "spotify not running",
+        }
+
+    async def spotify(line, data):
+        if not line.strip():
+            return await DataSource.spotify_stopped(data)
 
+        state, _, title = line.partition("\t")
         return {
-            "state": playerctl_status.stdout.strip(),  # Playing or Paused
-            "title": playing.stdout.strip(),
+            "state": state,  # Playing or Paused
+            "title": title,
         }
 
 
@@ -67,25 +70,32 @@ class BottomStatusBar(WindowBase):
     """
     def __init__(self) -> None:
         super().__init__()
-        self.state = ShellWindow(dock_direction=Direction.Bottom, is_statusbar=True)
+        self.state = ShellWindow(
+            dock_direction=Direction.Bottom | Direction.Left,
+            monitor_preference=MonitorPreference.Primary,
+            is_statusbar=True, target_fps=5
+        )
 
+        self.theme = THEME
         self.data["bar_size"] = 32
+        # Show the last run's values until the fetchers report
+        self.data_cache = DataCache.for_window("statusbar")
         # Pay attention to the datafetcher key names here
         # that is how their data is accessed later.
+        # Updated right after every full second
+        self.attach_data(sources.clock(key="time"))
         self.attach_data(
-            DataFetcher(
-                key="time", function=DataSource.time, delay_ms=100
-            )
-        )
-        self.attach_data(
-            DataFetcher(
-                key="spotify", function=DataSource.spotify, delay_ms=1000
+            StreamFetcher(
+                key="spotify",
+                command=DataSource.SPOTIFY_COMMAND,
+                parse=DataSource.spotify,
+                on_exit=DataSource.spotify_stopped, # e.g. playerctl not installed
             )
         )
 
     def init_hook(self):
         self.textures = {
-            "spotify": utils.load_icon("spotify", 16),
+            "spotify": utils.load_icon_async("spotify", 16),
         }
         
 
@@ -105,7 +115,7 @@ class BottomStatusBar(WindowBase):
         if data["state"] == "Stopped":
             text = "[spotify not open]"
         elif data["state"] == "Playing":
-            color = "#50fa7b"
+            color = self.theme.vec["playing"]
             text = (data["title"])
         elif data["state"] == "Paused":
             text = data["title"]
@@ -119,7 +129,7 @@ class BottomStatusBar(WindowBase):
         self.imgui_icon("spotify", ICON_SIZE)
         imgui.set_cursor_pos((cursor.x + centered_x, cursor.y))
         if color:
-            imgui.text_colored(text, *utils.vec_color(color))
+            imgui.text_colored(text, *color)
         else:
             imgui.text(text)
         color = None
@@ -142,14 +152,13 @@ class BottomStatusBar(WindowBase):
 
     def setup_bar(self):
         state = self.state
-        data = self.data
-        primary_monitor = glfw.get_primary_monitor()
-        x, y, workarea_width, height = glfw.get_monitor_workarea(
-            primary_monitor
-        )
-        state.min_size = [workarea_width, data["bar_size"]]
+        if state.workarea is None:
+            return # No monitor connected
+        # The cached work area of the primary monitor, the backend docks
+        # the bar to its bottom left corner
+        _, _, workarea_width, _ = state.workarea
+        state.min_size = [workarea_width, self.data["bar_size"]]
         state.max_size = state.min_size
-        state.pos = [x, y + height - data["bar_size"]]
         state.apply_bounds()
         imgui.set_next_window_size(*state.size)
 
@@ -165,10 +174,12 @@ class BottomStatusBar(WindowBase):
             imgui.columns(1)
 
 
-bar = BottomStatusBar()
-bar.blocking = False
-Backend.add_window(bar)
-try:
-    Backend.run_backend()
-except KeyboardInterrupt:
-    pass
+if __name__ == "__main__":
+    bar = BottomStatusBar()
+    bar.blocking = False
+    Backend.redraw_on_demand = True # The bar only changes when data does
+    Backend.add_window(bar)
+    try:
+        Backend.run_backend()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,83 @@
+import itertools
+import json
+import platform
+import subprocess
+import time
+from collections import deque
+from pathlib import Path
+
+import pytest
+
+_results = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-out", default=None,
+        help="Write benchmark results to this JSON file, e.g. to compare commits"
+    )
+
+
+@pytest.fixture
+def bench(request):
+    """
+    Record named benchmark values, bench(frame_build_ms=1.2)
+    """
+    def record(**values):
+        _results.setdefault(request.node.name, {}).update(values)
+    return record
+
+
+@pytest.fixture
+def texture_gl(monkeypatch):
+    """
+    TextureManager without a GL context: texture IDs are counted and
+    uploads go nowhere. Returns the fake OpenGL.GL module
+    """
+    from uxceptional import textures
+    from uxceptional.textures import TextureManager
+    ids = itertools.count(100)
+
+    class FakeGL:
+        def glGenTextures(self, count):
+            return next(ids)
+
+        def __getattr__(self, name):
+            if name.startswith("GL_"):
+                return 0
+            return lambda *args: None
+
+    fake = FakeGL()
+    monkeypatch.setattr(textures, "gl", fake)
+    monkeypatch.setattr(TextureManager, "shared_group", "test")
+    monkeypatch.setattr(TextureManager, "_textures", {})
+    monkeypatch.setattr(TextureManager, "_atlases", {})
+    monkeypatch.setattr(TextureManager, "_placeholders", {})
+    monkeypatch.setattr(TextureManager, "_uploads", deque())
+    TextureManager.forget()
+    yield fake
+    TextureManager.forget()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=Path(__file__).parent
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def pytest_sessionfinish(session):
+    out = session.config.getoption("--bench-out")
+    if not out or not _results:
+        return
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": _results,
+    }
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
@@ -0,0 +1,234 @@
+from types import SimpleNamespace
+
+import imgui
+import pytest
+
+from uxceptional import Backend, Monitors, WindowBase, backend
+from uxceptional.glfwimpl import GlfwImpl
+
+
+class RecordingGlfw:
+    """
+    Stands in for glfw in uxceptional.backend, records every call
+    """
+    def __init__(self) -> None:
+        self.calls = []
+        self.time = 0.0
+
+    def get_time(self):
+        return self.time
+
+    def __getattr__(self, name):
+        if name.isupper():
+            return name
+        def call(*args):
+            self.calls.append((name, *args))
+        return call
+
+
+@pytest.fixture
+def fake_glfw(monkeypatch):
+    recording = RecordingGlfw()
+    monkeypatch.setattr(backend, "glfw", recording)
+    monkeypatch.setattr(Backend, "windowlist", [])
+    monkeypatch.setattr(Backend, "windowqueue", [])
+    return recording
+
+
+@pytest.mark.parametrize("redraw_on_demand", [False, True])
+def test_hidden_windows_block(fake_glfw, monkeypatch, redraw_on_demand):
+    monkeypatch.setattr(Backend, "redraw_on_demand", redraw_on_demand)
+    window = WindowBase()
+    window.visible = False
+    Backend.windowlist.append(window)
+
+    Backend.dispatch_events()
+    assert fake_glfw.calls == [("wait_events_timeout", Backend.idle_timeout)]
+
+
+def test_due_window_polls(fake_glfw):
+    window = WindowBase()
+    Backend.windowlist.append(window)
+
+    Backend.dispatch_events()
+    assert fake_glfw.calls == [("poll_events",)]
+
+
+def test_redraw_on_demand(monkeypatch):
+    monkeypatch.setattr(Backend, "redraw_on_demand", True)
+    window = WindowBase()
+    window.state.renderer = SimpleNamespace(damaged=False)
+    window.redraw_frames = 0
+    assert not Backend.needs_redraw(window)
+
+    window.data["clock"] = "12:00"
+    assert Backend.needs_redraw(window)
+    window.frame_generation = window.data.generation
+    assert not Backend.needs_redraw(window)
+
+    window.state.renderer.damaged = True # e.g. exposed after being covered
+    assert Backend.needs_redraw(window)
+    window.state.renderer.damaged = False
+
+    window.request_redraw(Backend.input_redraw_frames)
+    assert Backend.needs_redraw(window)
+    window.redraw_frames = 0
+
+    window.animating = True
+    assert Backend.needs_redraw(window)
+    window.visible = False
+    assert not Backend.needs_redraw(window)
+
+
+class RecordingAtlas:
+    """
+    Stands in for the shared imgui font atlas
+    """
+    def __init__(self) -> None:
+        self.rasterized = []
+
+    def add_font_from_file_ttf(self, path, size):
+        self.rasterized.append((path, size))
+        return f"{path}@{size}"
+
+
+def test_fonts_rasterized_once(monkeypatch):
+    atlas = RecordingAtlas()
+    monkeypatch.setattr(Backend, "init_shared", lambda: None)
+    monkeypatch.setattr(Backend, "font_atlas", atlas)
+    monkeypatch.setattr(Backend, "fonts", {})
+    monkeypatch.setattr(Backend, "_font_files", {})
+    monkeypatch.setattr(Backend, "_fonts_dirty", False)
+    monkeypatch.setattr(GlfwImpl, "shared_font_texture", None)
+
+    body = Backend.add_font("body", "/fonts/sans.ttf", 13)
+    assert Backend.add_font("label", "/fonts/sans.ttf", 13.0) is body
+    assert atlas.rasterized == [("/fonts/sans.ttf", 13.0)]
+    assert not Backend._fonts_dirty # The texture is not built yet
+
+    monkeypatch.setattr(GlfwImpl, "shared_font_texture", 1)
+    title = Backend.add_font("title", "/fonts/sans.ttf", 20)
+    assert title is not body
+    assert Backend.fonts == {"body": body, "label": body, "title": title}
+    assert len(atlas.rasterized) == 2
+    assert Backend._fonts_dirty # Built before, has to be rebuilt
+
+
+def test_frame_schedule(monkeypatch):
+    monkeypatch.setattr(Backend, "frame_rate", 60)
+    statusbar = WindowBase()
+    statusbar.state.target_fps = 2
+    interval = Backend.frame_interval(statusbar.state)
+    assert interval == 0.5
+
+    Backend.schedule_next_frame(statusbar.state, 10.0)
+    assert statusbar.state.next_frame == 10.0 # Missed frames are not caught up
+    Backend.schedule_next_frame(statusbar.state, 10.01)
+    assert statusbar.state.next_frame == 10.5 # Steady cadence
+    assert not Backend.frame_due(statusbar.state, 10.2)
+    assert Backend.frame_due(statusbar.state, 10.4) # Within a quarter frame
+
+
+def test_fastest_window_paces(fake_glfw, monkeypatch):
+    monkeypatch.setattr(Backend, "vsync", True)
+    monkeypatch.setattr(Backend, "pacer", None)
+    statusbar, launcher = WindowBase(), WindowBase()
+    statusbar.state.target_fps, statusbar.state.window_id = 2, "statusbar"
+    launcher.state.window_id = "launcher" # Backend.frame_rate
+    Backend.windowlist.extend([statusbar, launcher])
+
+    Backend.choose_pacer()
+    assert Backend.pacer is launcher
+    assert fake_glfw.calls == [("make_context_current", "launcher"), ("swap_interval", 1)]
+    assert Backend.frame_order() == [statusbar, launcher]
+
+    fake_glfw.calls.clear()
+    Backend.windowlist.remove(launcher)
+    Backend.choose_pacer()
+    assert Backend.pacer is statusbar
+    assert fake_glfw.calls == [("make_context_current", "statusbar"), ("swap_interval", 1)]
+
+    fake_glfw.calls.clear()
+    monkeypatch.setattr(Backend, "vsync", False)
+    Backend.choose_pacer()
+    assert Backend.pacer is None
+    assert fake_glfw.calls == [("make_context_current", "statusbar"), ("swap_interval", 0)]
+
+
+def test_events_polled_once_per_tick(fake_glfw):
+    Backend.windowlist.extend([WindowBase(), WindowBase(), WindowBase()])
+
+    Backend.dispatch_events()
+    assert fake_glfw.calls == [("poll_events",)]
+
+
+class PooledImpl:
+    """
+    Stands in for the GlfwImpl of a pooled window
+    """
+    window_pos = (0, 0)
+
+    def __init__(self) -> None:
+        self.resets = 0
+        self.shut_down = False
+
+    def sync_window_state(self):
+        pass
+
+    def reset(self):
+        self.resets += 1
+
+    def shutdown(self):
+        self.shut_down = True
+
+
+@pytest.fixture
+def pool(fake_glfw, monkeypatch):
+    created = []
+    def create_pooled():
+        pooled = (f"window{len(created)}", PooledImpl(), imgui.create_context())
+        created.append(pooled)
+        return pooled
+    previous = imgui.get_current_context()
+    monkeypatch.setattr(Backend, "_create_pooled", create_pooled)
+    monkeypatch.setattr(Backend, "_pool", [])
+    monkeypatch.setattr(Backend, "pool_size", 1)
+    monkeypatch.setattr(Backend, "share_window", "shared")
+    monkeypatch.setattr(Backend, "pacer", None)
+    monkeypatch.setattr(Monitors, "_layout", [])
+    yield created
+    for _, _, context in Backend._pool:
+        imgui.destroy_context(context)
+    if previous is not None:
+        imgui.set_current_context(previous)
+
+
+def test_pool_reuse_and_refill(pool, fake_glfw):
+    assert Backend.warm_pool()
+    assert not Backend.warm_pool() # Full
+    warm = Backend._pool[0]
+
+    first = WindowBase()
+    Backend._add_window(first)
+    assert first.state.window_id == warm[0] and first.state.context is warm[2]
+    assert ("show_window", warm[0]) in fake_glfw.calls
+    assert Backend.warm_pool() # Refilled after being taken
+    second = WindowBase()
+    Backend._add_window(second)
+    assert second.state.window_id == pool[1][0]
+
+    Backend.close_window(first) # Pool is empty, first is kept
+    window, impl, context = Backend._pool[0]
+    assert window == warm[0] and impl.resets == 1
+    assert context is not warm[2] # Fresh imgui context
+    assert first.state.window_id is first.state.context is None
+
+    Backend.close_window(second) # Pool is full
+    assert pool[1][1].shut_down
+    assert ("destroy_window", pool[1][0]) in fake_glfw.calls
+    assert Backend._pool == [(window, impl, context)]
+
+    third = WindowBase()
+    Backend._add_window(third)
+    assert third.state.window_id == warm[0] and len(pool) == 2
+    Backend.close_window(third)
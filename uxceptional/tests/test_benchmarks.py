@@ -0,0 +1,218 @@
+"""
+Benchmarks of the bundled examples on the headless backend.
+Run with --bench-out=results.json to keep the numbers, see conftest.py
+"""
+import asyncio
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from uxceptional import DataFetcher, DataScheduler, HeadlessBackend, Texture, TextureManager, WindowBase
+
+EXAMPLES = Path(__file__).parent.parent.parent / "examples"
+PACKAGE = Path(__file__).parent.parent
+FRAMES = 300
+HEAVY_MODULES = ("glfw", "imgui", "OpenGL", "PIL", "ewmh", "xdg.IconTheme")
+
+# Run in a fresh interpreter: load an example, draw its first frame headless
+FIRST_FRAME = """
+import importlib.util, json, sys
+spec = importlib.util.spec_from_file_location("example", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+from uxceptional import HeadlessBackend
+window = getattr(module, sys.argv[2])()
+window.data.update(json.loads(sys.argv[3]))
+window.textures = {"spotify": 2}
+HeadlessBackend.add_window(window)
+HeadlessBackend.run_frames(1)
+"""
+
+
+def load_example(name):
+    path = EXAMPLES / name / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(f"example_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def statusbar_window():
+    statusbar = load_example("statusbar")
+    window = statusbar.BottomStatusBar()
+    window.data_cache = None # Keep the test values out of the user's cache
+    window.data.update({
+        "time": "Sat Oct 17 12:00:00 UTC 2026",
+        "spotify": {"state": "Playing", "title": "Artist - Title"},
+    })
+    window.textures = {"spotify": Texture(("icon", "spotify", 16, None), 2, 16, 16)}
+    return window
+
+
+def basic_window():
+    basic = load_example("basic")
+    window = basic.ExampleWindow()
+    window.data["date"] = "Sat Oct 17 12:00:00 UTC 2026"
+    return window
+
+
+@pytest.mark.parametrize("example", ["statusbar", "basic"])
+def test_frame_build(example, bench):
+    window = statusbar_window() if example == "statusbar" else basic_window()
+    window.retained = False # Build every frame
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(10) # Let auto sizing settle
+        frame = HeadlessBackend.run_frames(FRAMES)[window]
+    finally:
+        HeadlessBackend.remove_window(window)
+
+    build = window.frame_stats.build
+    assert frame.vertices > 0 and frame.commands > 0
+    bench(
+        build_mean_ms=build.mean(),
+        build_p95_ms=build.percentile(95),
+        vertices=frame.vertices,
+        indices=frame.indices,
+        draw_commands=frame.commands,
+        draw_lists=frame.draw_lists,
+    )
+
+
+@pytest.mark.parametrize("example", ["statusbar", "basic"])
+def test_retained_frame(example, bench):
+    window = statusbar_window() if example == "statusbar" else basic_window()
+    HeadlessBackend.add_window(window)
+    try:
+        built = HeadlessBackend.run_frames(10)[window]
+        frame = HeadlessBackend.run_frames(FRAMES)[window]
+        window.data["changed"] = True
+        HeadlessBackend.run_frames(1)
+    finally:
+        HeadlessBackend.remove_window(window)
+
+    assert window.frame_builds == 1 # Rebuilt after the data change
+    assert (frame.vertices, frame.commands) == (built.vertices, built.commands)
+    bench(
+        cached_mean_ms=window.frame_stats.build.mean(),
+        cached_p95_ms=window.frame_stats.build.percentile(95),
+    )
+
+
+def test_fetcher_jitter(bench):
+    async def tick(data):
+        return time.monotonic()
+
+    window = WindowBase()
+    window.blocking = False
+    fetcher = DataFetcher("tick", tick, delay_ms=10)
+    window.attach_data(fetcher)
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.5)
+    DataScheduler.unregister(window)
+
+    lateness = fetcher.stats.lateness
+    assert lateness.count >= 10
+    bench(
+        lateness_mean_ms=lateness.mean(),
+        lateness_p95_ms=lateness.percentile(95),
+        lateness_max_ms=lateness.max(),
+        runs=fetcher.stats.runs,
+    )
+
+
+def test_texture_decode_throughput(tmp_path, bench):
+    paths = []
+    for i in range(32):
+        path = tmp_path / f"icon{i}.png"
+        Image.new("RGBA", (128, 128), (i, 0, 0, 255)).save(path)
+        paths.append(path)
+
+    TextureManager.forget()
+    started = time.perf_counter()
+    decoded = sum(len(TextureManager.decode(path, 32)[2]) for path in paths)
+    elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for path in paths:
+        TextureManager.decode(path, 32)
+    cached = time.perf_counter() - started
+    TextureManager.forget()
+
+    assert decoded == 32 * 32 * 32 * 4
+    bench(
+        icons_per_s=len(paths) / elapsed,
+        decoded_mb_per_s=decoded / elapsed / 1e6,
+        cached_icons_per_s=len(paths) / cached,
+    )
+
+
+def import_profile(statement):
+    """
+    Run statement with -X importtime in a fresh interpreter
+
+    Returns:
+        tuple[float, dict]: Total import time in ms and the cumulative ms
+            of each top level import
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, cwd=PACKAGE, check=True
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "): # Nested imports are indented
+            imports[name.strip()] = int(cumulative) / 1000.0
+    return sum(imports.values()), imports
+
+
+@pytest.mark.parametrize("statement,heavy", [
+    ("from uxceptional import DataFetcher, DataScheduler, DataStore, sources", ()),
+    ("from uxceptional import WindowBase", ("imgui",)),
+    ("from uxceptional import Backend", HEAVY_MODULES),
+], ids=["data", "window", "backend"])
+def test_import_time(statement, heavy, bench):
+    total, imports = import_profile(statement)
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"{statement}; import sys; print(sorted(sys.modules))"],
+        capture_output=True, text=True, cwd=PACKAGE, check=True
+    ).stdout
+    for module in HEAVY_MODULES:
+        assert (f"'{module}'" in loaded) == (module in heavy), module
+    bench(import_total_ms=total, **{f"import_{name}_ms": ms for name, ms in imports.items()})
+
+
+@pytest.mark.parametrize("example,window_class,data", [
+    ("statusbar", "BottomStatusBar", {
+        "time": "Sat Oct 17 12:00:00 UTC 2026",
+        "spotify": {"state": "Playing", "title": "Artist - Title"},
+    }),
+    ("basic", "ExampleWindow", {"date": "Sat Oct 17 12:00:00 UTC 2026"}),
+])
+def test_time_to_first_frame(example, window_class, data, tmp_path, bench):
+    """
+    Interpreter start to the first headless frame, GL context creation aside
+    """
+    path = EXAMPLES / example / f"{example}.py"
+    env = {**os.environ, "XDG_CACHE_HOME": str(tmp_path)} # Not the user's data cache
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", FIRST_FRAME, str(path), window_class, json.dumps(data)],
+        cwd=PACKAGE, env=env, check=True
+    )
+    elapsed = (time.perf_counter() - started) * 1000.0
+    baseline = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    interpreter = (time.perf_counter() - baseline) * 1000.0
+    bench(first_frame_ms=elapsed, interpreter_ms=interpreter)
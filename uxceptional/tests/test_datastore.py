@@ -0,0 +1,55 @@
+from uxceptional import DataStore
+
+
+def test_generation_only_moves_on_change():
+    store = DataStore({"time": "12:00"})
+    generation = store.generation
+
+    assert not store.publish("time", "12:00")
+    assert store.generation == generation
+
+    assert store.publish("time", "12:01")
+    assert store.generation == generation + 1
+    assert store["time"] == "12:01"
+
+
+def test_changed_since_is_per_key():
+    store = DataStore({"time": "12:00", "spotify": None})
+    seen = store.generation
+    store["time"] = "12:01"
+
+    assert store.changed_since("time", seen)
+    assert not store.changed_since("spotify", seen)
+    assert not store.changed_since("time", store.generation)
+
+
+def test_snapshot_is_not_affected_by_writes():
+    store = DataStore({"a": 1})
+    snapshot = store.snapshot()
+    store.update(a=2, b=3)
+
+    assert dict(snapshot) == {"a": 1}
+    assert dict(store) == {"a": 2, "b": 3}
+
+
+def test_delete_bumps_generation():
+    store = DataStore({"a": 1})
+    seen = store.generation
+    del store["a"]
+
+    assert "a" not in store
+    assert store.changed_since("a", seen)
+
+
+def test_restore_marks_stale_until_published():
+    store = DataStore({"time": "12:00"})
+    store.restore({"time": "11:00", "spotify": {"state": "Playing"}})
+
+    assert store["time"] == "12:00"
+    assert not store.is_stale("time")
+    assert store.is_stale("spotify")
+
+    generation = store.generation
+    assert store.publish("spotify", {"state": "Playing"}) # Same value, now fresh
+    assert store.changed_since("spotify", generation)
+    assert not store.is_stale("spotify")
@@ -0,0 +1,175 @@
+from types import SimpleNamespace
+
+import imgui
+
+from uxceptional import HeadlessBackend, WindowBase, glfwimpl
+from uxceptional.glfwimpl import GlfwImpl, buffer_capacity, draw_list_digest, window_key
+
+
+class TextWindow(WindowBase):
+    def create_window(self):
+        with self.imgui_window("text"):
+            imgui.text(self.data.get("text", ""))
+
+
+def digests():
+    draw_data = imgui.get_draw_data()
+    return [
+        draw_list_digest(
+            commands,
+            commands.vtx_buffer_size * imgui.VERTEX_SIZE,
+            commands.idx_buffer_size * imgui.INDEX_SIZE,
+        )
+        for commands in draw_data.commands_lists
+    ]
+
+
+def test_draw_list_digest_follows_contents():
+    window = TextWindow()
+    window.retained = False
+    window.data["text"] = "hello"
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(3)
+        first = digests()
+        HeadlessBackend.run_frames(1)
+        same = digests()
+        window.data["text"] = "world"
+        HeadlessBackend.run_frames(1)
+        changed = digests()
+    finally:
+        HeadlessBackend.remove_window(window)
+
+    assert first == same
+    assert first != changed
+
+
+def test_buffer_capacity():
+    assert buffer_capacity(0) == 64 * 1024
+    assert buffer_capacity(64 * 1024 + 1) == 128 * 1024
+
+
+class RecordingGL:
+    """
+    Stands in for OpenGL.GL: records calls and, like a core profile
+    context, fails element buffer writes without one bound to the vertex array
+    """
+    GL_ELEMENT_ARRAY_BUFFER = "GL_ELEMENT_ARRAY_BUFFER"
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.vertex_array = 0
+        self.element_buffers = {} # vertex array -> bound element buffer
+
+    def glBindVertexArray(self, handle):
+        self.calls.append(("glBindVertexArray", handle))
+        self.vertex_array = handle
+
+    def glBindBuffer(self, target, handle):
+        self.calls.append(("glBindBuffer", target, handle))
+        if target == self.GL_ELEMENT_ARRAY_BUFFER:
+            self.element_buffers[self.vertex_array] = handle
+
+    def _write(self, name):
+        def write(target, *args):
+            self.calls.append((name, target))
+            if target == self.GL_ELEMENT_ARRAY_BUFFER and not self.element_buffers.get(self.vertex_array):
+                raise RuntimeError(f"{name}: GL_INVALID_OPERATION, no element buffer bound")
+        return write
+
+    def __getattr__(self, name):
+        if name in ("glBufferData", "glBufferSubData"):
+            return self._write(name)
+        if name.startswith("GL_"):
+            return name
+        return lambda *args: self.calls.append((name, *args))
+
+
+def unbound_impl():
+    """
+    GlfwImpl for the current imgui context, with no window or GL context
+    """
+    impl = GlfwImpl.__new__(GlfwImpl)
+    impl.io = imgui.get_io()
+    impl._shader_handle, impl._attrib_location_tex, impl._attrib_proj_mtx = 1, 0, 1
+    impl._vao_handle, impl._vbo_handle, impl._elements_handle = 2, 3, 4
+    impl._vbo_capacity = impl._ibo_capacity = 0
+    impl._list_digests = []
+    impl._render_state = None
+    return impl
+
+
+def test_render_binds_element_buffer(monkeypatch):
+    recording = RecordingGL()
+    monkeypatch.setattr(glfwimpl, "gl", recording)
+    window = TextWindow()
+    window.data["text"] = "hello"
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(3)
+        impl = unbound_impl()
+        impl.render(imgui.get_draw_data())
+        drawn = [call for call in recording.calls if call[0] == "glDrawElementsBaseVertex"]
+        recording.calls.clear()
+        impl.render(imgui.get_draw_data())
+    finally:
+        HeadlessBackend.remove_window(window)
+
+    assert recording.element_buffers[2] == 4
+    assert drawn
+    # Unchanged draw lists are drawn again without being uploaded
+    names = [call[0] for call in recording.calls]
+    assert "glBufferSubData" not in names and "glBufferData" not in names
+    assert names.count("glDrawElementsBaseVertex") == len(drawn)
+
+
+def test_present_keeps_clip_rects(monkeypatch):
+    recording = RecordingGL()
+    monkeypatch.setattr(glfwimpl, "gl", recording)
+    window = TextWindow()
+    window.data["text"] = "hello"
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(3)
+        impl = unbound_impl()
+        impl.io.display_fb_scale = (2.0, 2.0) # HiDPI
+        x, y, z, w = imgui.get_draw_data().commands_lists[0].commands[0].clip_rect
+        scissors = []
+        for _ in range(3): # A built frame and two repaints of it
+            recording.calls.clear()
+            impl.render(imgui.get_draw_data())
+            scissors.append([call for call in recording.calls if call[0] == "glScissor"])
+    finally:
+        HeadlessBackend.remove_window(window)
+
+    _, scissor_x, _, scissor_width, scissor_height = scissors[0][0]
+    assert (scissor_x, scissor_width, scissor_height) == (int(x * 2), int((z - x) * 2), int((w - y) * 2))
+    assert scissors[0] == scissors[1] == scissors[2]
+
+
+def test_callbacks_route_to_owning_impl(monkeypatch):
+    monkeypatch.setattr(GlfwImpl, "by_window", {})
+    impls = []
+    for window in (1, 2):
+        impl = GlfwImpl.__new__(GlfwImpl) # No window or GL context
+        impl.io = SimpleNamespace(display_size=(0, 0), mouse_pos=(0, 0))
+        impl.on_event, impl.input_generation = None, 0
+        impl.window_size, impl.window_pos, impl.focused = (0, 0), (0, 0), False
+        GlfwImpl.by_window[window_key(window)] = impl
+        impls.append(impl)
+    first, second = impls
+    events = []
+    second.on_event = lambda: events.append("second")
+
+    glfwimpl.dispatch("resize_callback")(2, 300, 24)
+    glfwimpl.dispatch("pos_callback")(2, 0, 1056)
+    glfwimpl.dispatch("focus_callback")(2, 1)
+    glfwimpl.dispatch("mouse_callback")(2, 5.0, 6.0)
+    glfwimpl.dispatch("focus_callback")(3, 1) # Not ours, e.g. the shared window
+
+    assert second.window_size == second.io.display_size == (300, 24)
+    assert second.window_pos == (0, 1056)
+    assert second.focused
+    assert second.io.mouse_pos == (5.0, 6.0)
+    assert second.input_generation == 4 and events == ["second"] * 4
+    assert first.input_generation == 0 and not first.focused
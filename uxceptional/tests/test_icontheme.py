@@ -0,0 +1,80 @@
+import os
+
+from uxceptional.icontheme import IconIndex
+
+INDEX_THEME = """[Icon Theme]
+Name=Test
+Inherits=hicolor
+Directories=16x16/apps,scalable/apps
+
+[16x16/apps]
+Size=16
+Type=Fixed
+
+[scalable/apps]
+Size=64
+MinSize=8
+MaxSize=512
+Type=Scalable
+"""
+
+HICOLOR_THEME = """[Icon Theme]
+Name=Hicolor
+Directories=32x32/apps
+
+[32x32/apps]
+Size=32
+Type=Threshold
+"""
+
+
+def make_icons(root):
+    test = root / "icons" / "test"
+    (test / "16x16" / "apps").mkdir(parents=True)
+    (test / "scalable" / "apps").mkdir(parents=True)
+    (test / "index.theme").write_text(INDEX_THEME)
+    (test / "16x16" / "apps" / "spotify.png").touch()
+    (test / "scalable" / "apps" / "spotify.svg").touch()
+
+    hicolor = root / "icons" / "hicolor"
+    (hicolor / "32x32" / "apps").mkdir(parents=True)
+    (hicolor / "index.theme").write_text(HICOLOR_THEME)
+    (hicolor / "32x32" / "apps" / "firefox.png").touch()
+    (hicolor / "32x32" / "apps" / "spotify.png").touch()
+
+    (root / "pixmaps").mkdir()
+    (root / "pixmaps" / "legacy.xpm").touch()
+    return [str(root / "icons"), str(root / "pixmaps")]
+
+
+def test_lookup_follows_theme_chain(tmp_path):
+    index = IconIndex("test", icondirs=make_icons(tmp_path))
+    index.scan()
+    icons = tmp_path / "icons"
+
+    assert index.lookup("spotify", 16) == str(icons / "test/16x16/apps/spotify.png")
+    # Inheriting themes win even over an exact match further down the chain
+    assert index.lookup("spotify", 32) == str(icons / "test/scalable/apps/spotify.svg")
+    assert index.lookup("firefox", 24) == str(icons / "hicolor/32x32/apps/firefox.png")
+    assert index.lookup("legacy", 16) == str(tmp_path / "pixmaps/legacy.xpm")
+    assert index.lookup("missing", 16) is None
+    assert index.lookup("/abs/icon.png", 16) == "/abs/icon.png"
+
+
+def test_cache_file_is_reused_and_invalidated(tmp_path):
+    icondirs = make_icons(tmp_path)
+    cache_file = tmp_path / "cache" / "icons.json"
+    IconIndex("test", icondirs=icondirs, cache_file=cache_file).scan()
+    assert cache_file.exists()
+
+    cached = IconIndex("test", icondirs=icondirs, cache_file=cache_file)
+    cached.scan = None # must not be needed
+    cached.load(background=False)
+    assert cached.lookup("firefox", 32).endswith("firefox.png")
+
+    apps = tmp_path / "icons" / "hicolor" / "32x32" / "apps"
+    (apps / "thunderbird.png").touch()
+    os.utime(apps, (0, 0))
+    stale = IconIndex("test", icondirs=icondirs, cache_file=cache_file)
+    stale.load(background=False)
+    assert stale.lookup("thunderbird", 32).endswith("thunderbird.png")
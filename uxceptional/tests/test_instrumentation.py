@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from uxceptional import DataFetcher, DataScheduler, WindowBase
+from uxceptional.instrumentation import FrameStats, Histogram, RingBuffer, Stats
+
+
+def test_ring_buffer_keeps_last_samples():
+    ring = RingBuffer(4)
+    assert ring.mean() == 0.0
+    for value in range(1, 7):
+        ring.add(value)
+
+    assert list(ring.values()) == [3, 4, 5, 6]
+    assert ring.last() == 6
+    assert ring.mean() == 4.5
+    assert ring.max() == 6
+    assert ring.percentile(50) == 5
+
+
+def test_histogram_buckets():
+    histogram = Histogram([1, 10])
+    for value in (0.5, 1, 5, 50):
+        histogram.add(value)
+
+    assert histogram.buckets() == [("<=1", 2), ("<=10", 1), (">10", 1)]
+
+
+def test_frame_stats_total():
+    stats = FrameStats()
+    stats.add(1.0, 2.0, 3.0, 4.0)
+
+    assert stats.frames == 1
+    assert stats.total.last() == 10.0
+    assert stats.summary()["build"]["max"] == 2.0
+
+
+def test_fetcher_stats_recorded():
+    async def slow(data):
+        await asyncio.sleep(0.03)
+        return 1
+
+    async def broken(data):
+        raise ValueError("broken")
+
+    window = WindowBase()
+    window.attach_data(DataFetcher("slow", slow, delay_ms=10))
+    window.attach_data(DataFetcher("hung", slow, delay_ms=1000, timeout_ms=1))
+    window.attach_data(DataFetcher("broken", broken, delay_ms=1000))
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.1)
+    DataScheduler.unregister(window)
+
+    slow_stats, hung_stats, broken_stats = (fet.stats for fet in window.fetchers)
+    assert slow_stats.runs >= 2
+    assert slow_stats.overruns == slow_stats.runs
+    assert slow_stats.lateness.count >= 1
+    assert hung_stats.timeouts >= 1
+    assert broken_stats.errors >= 1
+
+    summary = Stats.summary([window])
+    assert summary["windows"]["uxceptional"]["fetchers"]["slow"]["runs"] == slow_stats.runs
@@ -0,0 +1,62 @@
+import time
+from types import SimpleNamespace
+
+from uxceptional import DataFetcher, DataScheduler, WindowBase
+from uxceptional.polling import Aligned, Backoff, Fixed
+
+
+def result(changed, value=1, delay=100):
+    return SimpleNamespace(changed=changed, value=value, delay=delay)
+
+
+def test_fixed_keeps_cadence():
+    assert Fixed().next_due(result(True), 10.0, 10.02) == 10.1
+    assert Fixed().next_due(result(True), 10.0, 10.5) == 10.5
+
+
+def test_backoff_grows_until_change():
+    policy = Backoff(max_ms=500, factor=2.0)
+    delays = []
+    for changed in (True, False, False, False, False, True):
+        delays.append(round(policy.next_due(result(changed), 0.0, 0.0) * 1000))
+    assert delays == [100, 200, 400, 500, 500, 100]
+
+
+def test_backoff_idle_jumps_to_max():
+    policy = Backoff(max_ms=5000, idle=lambda value: value["state"] == "Stopped")
+    assert policy.next_due(result(True, {"state": "Stopped"}), 0.0, 0.0) == 5.0
+    assert policy.next_due(result(True, {"state": "Playing"}), 0.0, 0.0) == 0.1
+
+
+def test_aligned_lands_on_boundary():
+    policy = Aligned(1000)
+    now = 100.0
+    due = policy.next_due(result(True), now, now)
+    wall_due = time.time() + (due - now)
+    assert due - now <= 1.0 + Aligned.SLACK
+    assert abs(wall_due % 1.0 - Aligned.SLACK) < 0.002
+
+
+def test_paused_while_hidden():
+    calls = []
+
+    async def fn(data):
+        calls.append(1)
+        return len(calls)
+
+    window = WindowBase()
+    window.blocking = False
+    window.attach_data(DataFetcher("n", fn, delay_ms=10, pause_hidden=True))
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.05)
+    window.set_visible(False)
+    time.sleep(0.05)
+    paused = len(calls)
+    time.sleep(0.1)
+    assert len(calls) == paused
+
+    window.set_visible(True)
+    time.sleep(0.05)
+    DataScheduler.unregister(window)
+    assert len(calls) > paused
@@ -0,0 +1,201 @@
+import asyncio
+import time
+
+from uxceptional import DataCache, DataFetcher, DataScheduler, StreamFetcher, WindowBase
+
+
+def test_scheduler_runs_fetchers_by_deadline():
+    calls = {"fast": 0, "slow": 0}
+
+    def counter(key):
+        async def fn(data):
+            calls[key] += 1
+            return calls[key]
+        return fn
+
+    window = WindowBase()
+    window.attach_data(DataFetcher("fast", counter("fast"), delay_ms=20))
+    window.attach_data(DataFetcher("slow", counter("slow"), delay_ms=1000))
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.25)
+    DataScheduler.unregister(window)
+
+    assert window.data["fast"] >= 5
+    assert window.data["slow"] == 1
+    assert DataScheduler.is_alive()
+
+
+def test_unregister_stops_fetchers():
+    async def fn(data):
+        return data.get("n", 0) + 1
+
+    window = WindowBase()
+    window.blocking = False
+    window.attach_data(DataFetcher("n", fn, delay_ms=10))
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.1)
+    DataScheduler.unregister(window)
+    time.sleep(0.05)
+    stopped = window.data["n"]
+    time.sleep(0.1)
+
+    assert stopped > 0
+    assert window.data["n"] == stopped
+
+
+def test_slow_fetcher_does_not_stall_others():
+    async def hang(data):
+        await asyncio.sleep(10)
+
+    async def quick(data):
+        return "done"
+
+    window = WindowBase()
+    window.attach_data(DataFetcher("hang", hang, delay_ms=1000, timeout_ms=200))
+    window.attach_data(DataFetcher("quick", quick, delay_ms=1000))
+    window.init_hook = lambda: None
+    started = time.monotonic()
+    window._init()
+    elapsed = time.monotonic() - started
+    DataScheduler.unregister(window)
+
+    assert window.data == {"quick": "done"}
+    assert elapsed < 1
+
+
+def test_stream_fetcher_publishes_lines_and_restarts():
+    lines = []
+
+    async def parse(line, data):
+        lines.append(line)
+        return int(line)
+
+    window = WindowBase()
+    window.attach_data(StreamFetcher(
+        "count", "echo 1; echo 2", parse=parse, shell=True, restart_delay_ms=50
+    ))
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.2)
+    DataScheduler.unregister(window)
+
+    assert lines[:2] == ["1", "2"]
+    # The command exits right away, so it must have been restarted
+    assert len(lines) > 2
+
+
+def test_stream_fetcher_restarts_missing_command(capsys):
+    async def stopped(data):
+        return "not running"
+
+    fetcher = StreamFetcher(
+        "player", ["uxceptional-no-such-command"], restart_delay_ms=20,
+        max_restart_delay_ms=40, on_exit=stopped
+    )
+    window = WindowBase()
+    window.attach_data(fetcher)
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.2)
+    DataScheduler.unregister(window)
+
+    assert window.data["player"] == "not running"
+    assert 2 <= fetcher.stats.errors <= 10 # Retried with backoff, not in a loop
+    assert "FileNotFoundError" in capsys.readouterr().err
+
+
+def test_stream_fetcher_survives_parse_errors():
+    async def parse(line, data):
+        return int(line)
+
+    fetcher = StreamFetcher("count", "echo x; echo 2", parse=parse, shell=True, restart_delay_ms=20)
+    window = WindowBase()
+    window.attach_data(fetcher)
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.2)
+    DataScheduler.unregister(window)
+
+    assert fetcher.stats.errors >= 2
+    assert "count" not in window.data # Every run fails on its first line
+
+
+def test_shared_fetcher_runs_once_for_all_windows():
+    calls = []
+
+    async def fn(data):
+        calls.append(time.monotonic())
+        return len(calls)
+
+    windows = []
+    for key in ("a", "b", "c"):
+        window = WindowBase()
+        window.attach_data(DataFetcher(key, fn, delay_ms=50, share_key="shared"))
+        window.init_hook = lambda: None
+        window._init()
+        windows.append(window)
+    time.sleep(0.22)
+    first, second, third = windows
+    DataScheduler.unregister(first)
+    DataScheduler.unregister(second)
+    time.sleep(0.1)
+
+    # One run at startup and one per period, not one per window
+    assert 4 <= len(calls) <= 9
+    assert second.data["b"] >= first.data["a"]
+    assert third.data["c"] > first.data["a"]
+
+    DataScheduler.unregister(third)
+    time.sleep(0.05)
+    stopped = len(calls)
+    time.sleep(0.1)
+    assert len(calls) == stopped
+    assert "shared" not in DataScheduler._sources
+
+
+def test_shared_fetcher_stats_reported_by_every_subscriber():
+    async def fn(data):
+        raise ValueError("source down")
+
+    windows = []
+    for key in ("a", "b", "c"):
+        window = WindowBase()
+        window.attach_data(DataFetcher(key, fn, delay_ms=30, share_key="failing"))
+        window.init_hook = lambda: None
+        window._init()
+        windows.append(window)
+    time.sleep(0.1)
+    for window in windows:
+        DataScheduler.unregister(window)
+
+    stats = [window.fetchers[0].stats for window in windows]
+    assert stats[0].errors >= 2
+    assert all(s is stats[0] for s in stats)
+
+
+def test_warm_start_from_data_cache(tmp_path):
+    async def slow(data):
+        await asyncio.sleep(0.1)
+        return "fresh"
+
+    cache = DataCache(tmp_path / "data.json")
+    cache.save({"value": "cached", "unserializable": object()})
+
+    window = WindowBase()
+    window.data_cache = cache
+    window.attach_data(DataFetcher("value", slow, delay_ms=1000))
+    window.init_hook = lambda: None
+    started = time.perf_counter()
+    window._init() # Blocking, but every fetcher has a cached value
+    assert time.perf_counter() - started < 0.1
+    assert window.data["value"] == "cached"
+    assert window.data_stale("value")
+
+    time.sleep(0.2)
+    assert window.data["value"] == "fresh"
+    assert not window.data_stale("value")
+    DataScheduler.unregister(window)
+    window.close_data_cache()
+    assert cache.load() == {"value": "fresh"}
@@ -0,0 +1,229 @@
+import imgui
+import pytest
+
+from uxceptional import (Backend, DebugOverlayWindow, Direction, HeadlessBackend, Monitor,
+                         MonitorPreference, Monitors, ShellWindow, WindowBase)
+
+LEFT = Monitor(1, "left", (0, 0), (0, 0, 1920, 1050), primary=True)
+RIGHT = Monitor(2, "right", (1920, 0), (1920, 30, 2560, 1410))
+
+
+@pytest.fixture
+def monitors(monkeypatch):
+    """
+    Two monitors side by side, the previous layout is restored afterwards
+    """
+    monkeypatch.setattr(Monitors, "_layout", Monitors._layout)
+    monkeypatch.setattr(Monitors, "generation", Monitors.generation)
+    Monitors.set_layout([LEFT, RIGHT])
+
+
+def placed(dock, preference=MonitorPreference.Primary, size=(200, 100), window_pos=None):
+    state = ShellWindow(min_size=list(size), dock_direction=dock, monitor_preference=preference)
+    state.apply_bounds()
+    state.apply_monitor_preference(window_pos)
+    return state
+
+
+def test_dock_pos(monitors):
+    assert placed(Direction.Nothing).dock_pos() is None
+    assert placed(Direction.Bottom | Direction.Left).dock_pos() == [0, 950]
+    assert placed(Direction.Top | Direction.Right).dock_pos() == [1720, 0]
+    assert placed(Direction.Center).dock_pos() == [860, 475]
+    assert placed(Direction.Bottom).dock_pos() == [-1, 950]
+
+
+def test_active_follows_window(monitors):
+    state = placed(Direction.Top | Direction.Left, MonitorPreference.Active, window_pos=(2000, 100))
+    assert state.monitor is RIGHT
+    assert state.dock_pos() == [1920, 30]
+    assert not state.needs_monitor_update((2100, 100))
+    assert state.needs_monitor_update((100, 100)) # Moved to the left monitor
+
+    primary = placed(Direction.Top | Direction.Left, window_pos=(2000, 100))
+    assert primary.monitor is LEFT
+    assert not primary.needs_monitor_update((100, 100))
+
+
+def test_layout_change_invalidates(monitors):
+    state = placed(Direction.Bottom | Direction.Left)
+    assert not state.needs_monitor_update()
+    Monitors.set_layout([RIGHT])
+    assert state.needs_monitor_update()
+    state.apply_monitor_preference()
+    assert state.workarea == RIGHT.workarea
+
+
+class DockedWindow(WindowBase):
+    def __init__(self) -> None:
+        super().__init__()
+        self.state = ShellWindow(dock_direction=Direction.Bottom | Direction.Right)
+
+    def create_window(self):
+        with self.imgui_window("docked"):
+            pass
+
+
+def test_headless_docks_window(monitors):
+    window = DockedWindow()
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(1)
+        width, height = window.state.size
+        assert window.state.pos == [1920 - width, 1050 - height]
+
+        Monitors.set_layout([RIGHT])
+        HeadlessBackend.run_frames(1)
+        assert window.state.pos == [1920 + 2560 - width, 30 + 1410 - height]
+    finally:
+        HeadlessBackend.remove_window(window)
+
+
+def test_settle_hysteresis():
+    state = ShellWindow()
+    assert state.settle(101.5, 0) == 104 # Grows to the next step right away
+    assert state.settle(90, 104) == 104 # Small shrinks are ignored
+    assert state.settle(70, 104) == 72
+
+
+class TitleWindow(WindowBase):
+    def create_window(self):
+        state = self.state
+        with self.imgui_window("title"):
+            self.candidates += 1
+            imgui.text(self.data["title"])
+            state.width_candidate()
+            state.height_candidate()
+            state.apply_bounds()
+
+
+def test_layout_measured_once_per_generation():
+    window = TitleWindow()
+    window.candidates = 0
+    window.state.min_size = [10, 10]
+    window.data["title"] = "Artist - Title"
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(5)
+        size = list(window.state.size)
+        assert window.state.layout_size == size
+
+        window.data["title"] = "Artist - Titl" # A glyph narrower
+        HeadlessBackend.run_frames(5)
+        assert window.state.size == size
+
+        window.data["title"] = "Artist - Title, a much longer title"
+        HeadlessBackend.run_frames(5)
+        assert window.state.size[0] > size[0]
+        assert window.state.min_size == [10, 10]
+    finally:
+        HeadlessBackend.remove_window(window)
+
+
+def test_animating_window_measures_every_frame(monkeypatch):
+    monkeypatch.setattr(Backend, "windowlist", [])
+    overlay = DebugOverlayWindow()
+    HeadlessBackend.add_window(overlay)
+    try:
+        HeadlessBackend.run_frames(3)
+        height = overlay.state.size[1]
+        Backend.windowlist.extend(WindowBase() for _ in range(3)) # No data change
+        HeadlessBackend.run_frames(3)
+        assert overlay.state.size[1] > height
+    finally:
+        HeadlessBackend.remove_window(overlay)
+
+
+class ListWindow(TitleWindow):
+    """
+    Content from an attribute, added to the layout key
+    """
+    def layout_key(self):
+        return (super().layout_key(), len(self.lines))
+
+    def create_window(self):
+        state = self.state
+        with self.imgui_window("list"):
+            for line in self.lines:
+                imgui.text(line)
+            state.width_candidate()
+            state.height_candidate()
+            state.apply_bounds()
+
+
+def test_window_inputs_in_layout_key():
+    window = ListWindow()
+    window.state.min_size = [10, 10]
+    window.lines = ["one"]
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(3)
+        height = window.state.size[1]
+        window.lines += ["two", "three"]
+        window.request_redraw()
+        HeadlessBackend.run_frames(3)
+        assert window.state.size[1] > height
+    finally:
+        HeadlessBackend.remove_window(window)
+
+
+class ButtonsWindow(WindowBase):
+    """
+    Text measured before a row of buttons, like the example popup
+    """
+    def create_window(self):
+        state = self.state
+        with self.imgui_window("buttons"):
+            imgui.text(self.data["text"])
+            state.width_candidate()
+            imgui.button("OK")
+            state.width_candidate()
+            imgui.same_line()
+            self.cursors.append((state.measuring, imgui.get_cursor_pos()))
+            imgui.button("Cancel")
+            state.height_candidate()
+            state.apply_bounds()
+
+
+def test_cached_layout_keeps_cursor():
+    window = ButtonsWindow()
+    window.state.min_size = [10, 10]
+    window.cursors = []
+    window.data["text"] = "12:00:00"
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(3)
+        window.data["text"] = "12:00:01"
+        HeadlessBackend.run_frames(3)
+    finally:
+        HeadlessBackend.remove_window(window)
+
+    measured = {tuple(pos) for measuring, pos in window.cursors if measuring}
+    cached = {tuple(pos) for measuring, pos in window.cursors if not measuring}
+    assert measured and cached
+    assert measured == cached
+
+
+class BarWindow(WindowBase):
+    def __init__(self) -> None:
+        super().__init__()
+        self.state = ShellWindow(
+            min_size=[1920, 32], max_size=[1920, 32],
+            dock_direction=Direction.Bottom | Direction.Left
+        )
+
+    def create_window(self):
+        with self.imgui_window("bar"):
+            imgui.text("12:00")
+
+
+def test_docked_flush_with_work_area(monitors):
+    bar = BarWindow()
+    HeadlessBackend.add_window(bar)
+    try:
+        HeadlessBackend.run_frames(1)
+    finally:
+        HeadlessBackend.remove_window(bar)
+    assert bar.state.padding != [0, 0]
+    assert bar.state.size == [1920, 32] # Given to the OS window
+    assert bar.state.pos == [0, 1050 - 32]
@@ -0,0 +1,92 @@
+import asyncio
+import shutil
+from pathlib import Path
+
+from uxceptional import sources
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def poll(fetcher):
+    return asyncio.run(fetcher.function({}))
+
+
+def test_parse_proc_stat():
+    text = (FIXTURES / "proc" / "stat").read_text()
+    assert sources.parse_proc_stat(text) == (8100, 9450)
+
+
+def test_cpu_load_uses_delta_between_polls(tmp_path):
+    stat = tmp_path / "stat"
+    shutil.copy(FIXTURES / "proc" / "stat", stat)
+    fetcher = sources.cpu_load(path=stat)
+
+    assert poll(fetcher) == 0.0
+    # 100 more jiffies of which 25 idle
+    stat.write_text("cpu  1060 20 315 8025 100 0 30 0 0 0\n")
+    assert poll(fetcher) == 75.0
+
+
+def test_memory():
+    fetcher = sources.memory(path=FIXTURES / "proc" / "meminfo")
+    assert poll(fetcher) == {
+        "total": 16000000,
+        "available": 4000000,
+        "used": 12000000,
+        "percent": 75.0,
+    }
+
+
+def test_parse_net_dev():
+    text = (FIXTURES / "proc" / "net_dev").read_text()
+    assert sources.parse_net_dev(text) == {
+        "lo": (5000, 5000),
+        "eth0": (100000, 20000),
+        "wlan0": (50000, 10000),
+    }
+
+
+def test_network_rates(tmp_path):
+    net_dev = tmp_path / "net_dev"
+    shutil.copy(FIXTURES / "proc" / "net_dev", net_dev)
+    fetcher = sources.network(interface="eth0", path=net_dev)
+
+    assert poll(fetcher) == {"rx": 0.0, "tx": 0.0}
+    net_dev.write_text(net_dev.read_text().replace("100000", "110000"))
+    rates = poll(fetcher)
+    assert rates["rx"] > 0
+    assert rates["tx"] == 0
+
+
+def test_battery_and_missing_battery():
+    fetcher = sources.battery(path=FIXTURES / "power_supply")
+    assert poll(fetcher) == {"capacity": 87, "status": "Discharging"}
+
+    missing = sources.battery(name="BAT9", path=FIXTURES / "power_supply")
+    assert poll(missing) is None
+
+
+def test_proc_file_reads_large_files(tmp_path):
+    path = tmp_path / "big"
+    path.write_text("x" * (sources.ProcFile.CHUNK * 2 + 10))
+    assert len(sources.ProcFile(path).read()) == sources.ProcFile.CHUNK * 2 + 10
+
+
+def test_clock():
+    assert poll(sources.clock(time_format="static")) == "static"
+
+
+def test_backlight(tmp_path):
+    device = tmp_path / "intel_backlight"
+    device.mkdir()
+    (device / "brightness").write_text("300\n")
+    (device / "max_brightness").write_text("1200\n")
+    assert poll(sources.backlight(path=tmp_path)) == 25
+    assert poll(sources.backlight(path=tmp_path / "missing")) is None
+
+
+def test_link_state(tmp_path):
+    for name, state in (("lo", "unknown"), ("eth0", "up"), ("wlan0", "down")):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "operstate").write_text(state + "\n")
+    assert poll(sources.link_state(path=tmp_path)) == {"eth0": "up", "wlan0": "down"}
@@ -0,0 +1,101 @@
+import time
+
+from PIL import Image
+
+from uxceptional import Backend, TextureManager, WindowBase, apputils, backend
+
+
+def icon(tmp_path, name, size):
+    path = tmp_path / f"{name}.png"
+    Image.new("RGBA", (size, size), (255, 0, 0, 255)).save(path)
+    return path
+
+
+def test_small_images_share_an_atlas(tmp_path, texture_gl):
+    first = TextureManager.texture(icon(tmp_path, "a", 16))
+    second = TextureManager.texture(icon(tmp_path, "b", 16))
+    large = TextureManager.texture(icon(tmp_path, "c", 128))
+
+    assert first.atlas is not None and first.texture_id == second.texture_id
+    assert first.uv0 != second.uv0
+    assert first.uv1 == (16 / 1024, 16 / 1024)
+    assert large.atlas is None and large.uv1 == (1.0, 1.0)
+
+
+def test_cached_and_reference_counted(tmp_path, texture_gl):
+    path = icon(tmp_path, "a", 16)
+    texture = TextureManager.texture(path)
+    assert TextureManager.texture(path) is texture
+    assert texture.refs == 2
+
+    TextureManager.release(texture)
+    TextureManager.release(texture)
+    replacement = TextureManager.texture(path)
+    assert replacement is not texture
+    assert replacement.uv0 == texture.uv0 # Freed atlas region reused
+
+
+def test_load_texture_is_standalone(tmp_path, texture_gl):
+    path = icon(tmp_path, "a", 16)
+    packed = TextureManager.texture(path)
+    texture_id = apputils.load_texture(path)
+
+    assert texture_id != packed.texture_id
+    standalone = TextureManager.texture(path, pack=False)
+    assert standalone.texture_id == texture_id
+    assert (standalone.uv0, standalone.uv1) == ((0.0, 0.0), (1.0, 1.0))
+
+
+def wait_for_uploads(count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while TextureManager.pending_uploads() < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert TextureManager.pending_uploads() == count
+
+
+def test_async_uploads_within_budget(tmp_path, texture_gl):
+    textures = [TextureManager.texture_async(icon(tmp_path, f"i{i}", 128)) for i in range(4)]
+    assert not any(texture.ready for texture in textures) # Placeholders
+    wait_for_uploads(4)
+
+    assert TextureManager.process_uploads(budget_ms=0.0) == 1 # Always at least one
+    assert TextureManager.process_uploads(budget_ms=1000.0) == 3
+    assert all(texture.ready and texture.width == 128 for texture in textures)
+
+
+def test_backend_uploads_once_per_tick(tmp_path, texture_gl, monkeypatch):
+    calls = []
+    monkeypatch.setattr(backend.glfw, "make_context_current", lambda window: None)
+    monkeypatch.setattr(TextureManager, "process_uploads", lambda budget_ms: calls.append(budget_ms) or 1)
+    windows = [WindowBase() for _ in range(3)]
+    monkeypatch.setattr(Backend, "windowlist", windows)
+    for window in windows:
+        window.redraw_frames = 0
+
+    Backend.process_uploads()
+    assert calls == [] # Nothing queued
+    TextureManager.texture_async(icon(tmp_path, "a", 16))
+    wait_for_uploads(1)
+    Backend.process_uploads()
+    assert calls == [Backend.upload_budget_ms]
+    assert all(window.redraw_frames == 1 for window in windows)
+
+
+def test_failed_async_load_is_retried(tmp_path, texture_gl, capsys):
+    path = tmp_path / "late.png"
+    failed = TextureManager.texture_async(path)
+    deadline = time.monotonic() + 2.0
+    while TextureManager._textures and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not TextureManager._textures # Forgotten, not stuck as a placeholder
+    assert "Unable to load texture" in capsys.readouterr().err
+
+    Image.new("RGBA", (16, 16), (255, 0, 0, 255)).save(path)
+    texture = TextureManager.texture_async(path)
+    assert texture is not failed
+    wait_for_uploads(1)
+    TextureManager.process_uploads()
+    assert texture.ready and texture.width == 16
+
+    TextureManager.release(failed) # Leaves the retry alone
+    assert TextureManager.texture_async(path) is texture
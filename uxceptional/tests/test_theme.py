@@ -0,0 +1,91 @@
+import imgui
+import pytest
+
+from uxceptional import HeadlessBackend, Theme, WindowBase
+from uxceptional.apputils import vec_color
+
+
+class ThemedWindow(WindowBase):
+    def create_window(self):
+        style = imgui.get_style()
+        self.text_color = tuple(style.colors[imgui.COLOR_TEXT])
+        self.window_bg = tuple(style.colors[imgui.COLOR_WINDOW_BACKGROUND])
+        self.rounding = style.window_rounding
+        with self.imgui_window("themed"):
+            imgui.text("themed")
+
+
+def test_vec_color_cached():
+    vec_color.cache_clear()
+    assert vec_color("#ff000080") == (1.0, 0.0, 0.0, 128 / 255.0)
+    vec_color("#ff000080")
+    assert vec_color.cache_info().hits == 1
+
+
+def test_compile():
+    theme = Theme(
+        colors={"text": "#ff0000", "window_bg": "#000000"},
+        style={"window_rounding": 2.0},
+        palette={"accent": "#00ff00"},
+    )
+    assert (imgui.COLOR_TEXT, (1.0, 0.0, 0.0, 1.0)) in theme.compiled_colors
+    assert (imgui.COLOR_WINDOW_BACKGROUND, (0.0, 0.0, 0.0, 1.0)) in theme.compiled_colors
+    assert theme.vec["accent"] == (0.0, 1.0, 0.0, 1.0)
+    assert theme.u32["accent"] == 0xff00ff00
+
+    with pytest.raises(ValueError):
+        Theme(colors={"no_such_color": "#000000"})
+
+
+def test_update_recompiles_on_change_only():
+    theme = Theme(palette={"accent": "#00ff00"})
+    version = theme.version
+    assert not theme.update(palette={"accent": "#00ff00"})
+    assert theme.version == version
+    assert theme.update(palette={"accent": "#0000ff"})
+    assert theme.version == version + 1
+    assert theme.vec["accent"] == (0.0, 0.0, 1.0, 1.0)
+
+
+def test_theme_hot_swap():
+    window = ThemedWindow()
+    window.theme = Theme(colors={"text": "#ff0000"})
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(1)
+        assert window.text_color == (1.0, 0.0, 0.0, 1.0)
+        window.theme.update(colors={"text": "#0000ff"})
+        HeadlessBackend.run_frames(1)
+        assert window.text_color == (0.0, 0.0, 1.0, 1.0)
+        window.theme = Theme(colors={"text": "#00ff00"})
+        HeadlessBackend.run_frames(1)
+        assert window.text_color == (0.0, 1.0, 0.0, 1.0)
+    finally:
+        HeadlessBackend.remove_window(window)
+
+
+def test_swap_restores_untouched_entries():
+    window = ThemedWindow()
+    window.theme = Theme(colors={"window_bg": "#ff0000"}, style={"window_rounding": 9.0})
+    HeadlessBackend.add_window(window)
+    try:
+        HeadlessBackend.run_frames(1)
+        assert window.window_bg == (1.0, 0.0, 0.0, 1.0)
+        assert window.rounding == 9.0
+        default_text = window.base_style[0][imgui.COLOR_TEXT]
+        default_bg = window.base_style[0][imgui.COLOR_WINDOW_BACKGROUND]
+        default_rounding = window.base_style[1]["window_rounding"]
+        assert default_bg != window.window_bg and default_rounding != 9.0
+
+        window.theme = Theme(colors={"text": "#00ff00"})
+        HeadlessBackend.run_frames(1)
+        assert window.text_color == (0.0, 1.0, 0.0, 1.0)
+        assert window.window_bg == default_bg
+        assert window.rounding == default_rounding
+
+        window.theme = None
+        HeadlessBackend.run_frames(1)
+        assert window.text_color == default_text
+        assert window.window_bg == default_bg
+    finally:
+        HeadlessBackend.remove_window(window)
@@ -0,0 +1,113 @@
+import os
+import time
+
+from uxceptional import DataScheduler, WatchFetcher, WindowBase
+from uxceptional.watch import Inotify, drain, parse_uevent
+
+
+class PipeWatch:
+    def __init__(self) -> None:
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+
+    def fileno(self):
+        return self.read_fd
+
+    def read(self):
+        return drain(lambda: os.read(self.read_fd, 4096))
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+def test_watch_fetcher_runs_on_events_only():
+    pipe = PipeWatch()
+    calls = []
+
+    async def fn(data):
+        calls.append(1)
+        return len(calls)
+
+    window = WindowBase()
+    window.attach_data(WatchFetcher("n", fn, lambda: pipe, debounce_ms=5))
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.1)
+    assert window.data.get("n") == 1 # Initial value only, nothing happened
+
+    os.write(pipe.write_fd, b"x")
+    os.write(pipe.write_fd, b"y")
+    time.sleep(0.1)
+    DataScheduler.unregister(window)
+    time.sleep(0.05)
+
+    assert window.data["n"] == 2 # One run for the burst
+
+
+def test_watch_fetcher_debounce_stops_reading(monkeypatch):
+    pipe = PipeWatch()
+    wakeups = []
+    DataScheduler.start()
+    loop_class = type(DataScheduler.loop)
+    add_reader = loop_class.add_reader
+
+    def counting_add_reader(loop, fd, callback, *args):
+        def counted(*args):
+            wakeups.append(fd)
+            callback(*args)
+        return add_reader(loop, fd, counted, *args)
+    monkeypatch.setattr(loop_class, "add_reader", counting_add_reader)
+
+    async def fn(data):
+        return time.monotonic()
+
+    window = WindowBase()
+    window.attach_data(WatchFetcher("t", fn, lambda: pipe, debounce_ms=50))
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.05)
+    os.write(pipe.write_fd, b"x")
+    time.sleep(0.15)
+    DataScheduler.unregister(window)
+    time.sleep(0.05)
+
+    # One wakeup for the event, not one per loop iteration while debouncing
+    assert 1 <= wakeups.count(pipe.read_fd) <= 2
+
+
+def test_watch_fetcher_fallback():
+    pipe = PipeWatch()
+
+    async def fn(data):
+        return time.monotonic()
+
+    window = WindowBase()
+    window.attach_data(WatchFetcher("t", fn, lambda: pipe, fallback_ms=20))
+    window.init_hook = lambda: None
+    window._init()
+    time.sleep(0.05)
+    first = window.data["t"]
+    time.sleep(0.1)
+    DataScheduler.unregister(window)
+
+    assert window.data["t"] > first
+
+
+def test_inotify(tmp_path):
+    path = tmp_path / "brightness"
+    path.write_text("1")
+    watch = Inotify(path)
+    try:
+        assert watch.read() == []
+        path.write_text("2")
+        assert watch.read()
+    finally:
+        watch.close()
+
+
+def test_parse_uevent():
+    message = b"change@/devices/power_supply/BAT0\0ACTION=change\0SUBSYSTEM=power_supply\0POWER_SUPPLY_CAPACITY=80\0"
+    event = parse_uevent(message)
+    assert event["SUBSYSTEM"] == "power_supply"
+    assert event["POWER_SUPPLY_CAPACITY"] == "80"
@@ -1,5 +1,43 @@
 __version__ = '0.1.0'
-from .windowbase import WindowBase, DataFetcher
-from .shellwindow import ShellWindow, Direction, MonitorPreference
-from .backend import Backend
-from . import apputils
\ No newline at end of file
+# Names are imported on first use: the backend pulls in glfw, OpenGL, Pillow
+# and ewmh, which data only processes never need. Fetchers, sources and
+# DataStore load none of them, WindowBase only imgui.
+_exports = {
+    "WindowBase": ".windowbase",
+    "DataFetcher": ".fetchers",
+    "StreamFetcher": ".fetchers",
+    "WatchFetcher": ".fetchers",
+    "ShellWindow": ".shellwindow",
+    "Direction": ".shellwindow",
+    "MonitorPreference": ".shellwindow",
+    "Monitor": ".shellwindow",
+    "Monitors": ".shellwindow",
+    "Backend": ".backend",
+    "DataScheduler": ".scheduler",
+    "DataStore": ".datastore",
+    "DataCache": ".datacache",
+    "Texture": ".textures",
+    "TextureManager": ".textures",
+    "Theme": ".theme",
+    "DebugOverlayWindow": ".debugoverlay",
+    "HeadlessBackend": ".headless",
+}
+_submodules = {"apputils", "polling", "sources", "watch"}
+
+__all__ = [*_exports, *sorted(_submodules)]
+
+
+def __getattr__(name):
+    from importlib import import_module
+    if name in _exports:
+        value = getattr(import_module(_exports[name], __name__), name)
+    elif name in _submodules:
+        value = import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
@@ -1,10 +1,10 @@
 from pathlib import Path
-from typing import Union
+from typing import TYPE_CHECKING, Union
 import subprocess
 import asyncio
-from PIL import Image
-import OpenGL.GL as gl
-from xdg import IconTheme
+from functools import lru_cache
+if TYPE_CHECKING:
+    from .textures import Texture
 # This can / should be overridden
 resources_dir = None
 
@@ -18,12 +18,51 @@ def event(path, name):
     """
     print(f"{path}.{name}")
 
-def load_icon(icon_name, icon_size):
-    path = IconTheme.getIconPath(icon_name, icon_size)
-    return load_texture(path)
+def _texture_manager():
+    """
+    TextureManager, imported on first use as it loads OpenGL and Pillow
+    """
+    from .textures import TextureManager
+    return TextureManager
+
+def load_icon(icon_name, icon_size, theme=None) -> "Texture":
+    """Get a texture for an icon from the icon theme.
+    Small icons are packed into a shared atlas, draw them with
+    WindowBase.imgui_icon or the texture's uv0 / uv1.
+
+    Args:
+        icon_name (str): Icon name e.g. "spotify"
+        icon_size (int): Icon size in px
+        theme (str): Icon theme, default theme if None
+
+    Returns:
+        Texture: Cached texture handle, see TextureManager.release
+    """
+    return _texture_manager().icon(icon_name, icon_size, theme)
+
+def load_icon_async(icon_name, icon_size, theme=None) -> "Texture":
+    """Like load_icon, but decode the icon on a worker thread.
+    The texture draws nothing until the backend has uploaded it,
+    which happens within a few frames.
+
+    Returns:
+        Texture: Cached texture handle, see TextureManager.release
+    """
+    return _texture_manager().icon_async(icon_name, icon_size, theme)
+
+def load_texture_async(path) -> "Texture":
+    """Like load_texture, but decode the image on a worker thread.
+
+    Returns:
+        Texture: Cached texture handle, see TextureManager.release
+    """
+    return _texture_manager().texture_async(path)
 
 def load_texture(path):
-    """From an image path, return an opengl texture
+    """From an image path, return an opengl texture.
+    The image always gets a texture of its own, never an atlas region,
+    so it draws with the default UVs. It stays loaded for the whole
+    process, use TextureManager.texture for a handle that can be released.
 
     Args:
         path (str): Path to icon
@@ -31,30 +70,7 @@ def load_texture(path):
     Returns:
         int: OpenGL texture ID
     """
-    with Image.open(path) as im:
-        convert = im.convert("RGBA")
-        textureData = convert.tobytes()
-        width = im.width
-        height = im.width
-
-    tex = gl.glGenTextures(1)
-    gl.glBindTexture(gl.GL_TEXTURE_2D, tex)
-    gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
-    gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
-    gl.glTexImage2D(
-        gl.GL_TEXTURE_2D,
-        0,
-        gl.GL_RGBA,
-        width,
-        height,
-        0,
-        gl.GL_RGBA,
-        gl.GL_UNSIGNED_BYTE,
-        textureData,
-    )
-
-    gl.glBindTexture(gl.GL_TEXTURE_2D, 0)  # cleanup
-    return tex
+    return _texture_manager().texture(path, pack=False).texture_id
 
 def loadimg(resource_name):
     """
@@ -105,9 +121,42 @@ async def run_async(
         stdout, stderr = await proc.communicate()
         return subprocess.CompletedProcess(args, proc.returncode, stdout.decode("utf-8", errors="surrogateescape"), stderr.decode("utf-8", errors="surrogateescape"))
 
+async def run_stream(
+    command: Union[list[str], str], shell=False
+):
+    """
+    Start a long lived process and asynchronously yield each line it prints
+    to stdout, without the trailing newline. e.g.
+        async for line in run_stream(["pactl", "subscribe"]):
+            ...
+
+    Optionally, as a shell command.
+    The process is killed when the caller stops iterating.
+    """
+    if shell:
+        proc = await asyncio.create_subprocess_shell(command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    elif isinstance(command, str):
+        proc = await asyncio.create_subprocess_exec(command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    else:
+        proc = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+
+    try:
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            yield line.decode("utf-8", errors="surrogateescape").rstrip("\n")
+        await proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+@lru_cache(maxsize=512)
 def vec_color(hex) -> tuple[float, float, float, float]:
     """
-    Convert hex color to a vector array
+    Convert hex color to a vector array.
+    Cached, widgets call this every frame with a handful of colors
     """
     hex = hex.replace("#", "")
     r = int(hex[0:2], 16) / 255.0
@@ -2,19 +2,50 @@
 import glfw
 import imgui
 import OpenGL.GL as gl
+import ctypes
 import sys
+import time
 from ewmh import EWMH
 from .glfwimpl import GlfwImpl
-from .shellwindow import ShellWindow
+from .instrumentation import Stats
+from .scheduler import DataScheduler
+from .textures import TextureManager
+from .shellwindow import Monitors, ShellWindow
 from .windowbase import WindowBase
 
 
 class Backend:
     windowlist = []
     windowqueue = []
+    # Font registry, name -> imgui font in the atlas shared by every window
     fonts = {
         "default": None
     }
+    font_atlas = None # Shared by the imgui context of every window
+    _font_files = {} # (file, size) -> imgui font, each rasterized once
+    _fonts_dirty = False # Fonts were added after the font texture was built
+    _font_context = None # Owns font_atlas, never destroyed
+    # Hidden window whose GL context every window shares objects with
+    # (font texture, icon atlas, textures)
+    share_window = None
+    # Only draw windows that have pending damage and block on
+    # glfw.wait_events_timeout otherwise. See WindowBase.request_redraw
+    redraw_on_demand = False
+    idle_timeout = 1.0 # Max seconds to block while no window needs drawing
+    input_redraw_frames = 3 # imgui needs a few frames to settle after input
+    upload_budget_ms = 2.0 # Time per frame spent uploading background textures
+    # Frame scheduling. Only the pacer window swaps with vsync, every other
+    # window swaps immediately so one vblank is never waited on N times.
+    # Windows draw at ShellWindow.target_fps, or frame_rate if unset.
+    vsync = True # If false no window waits for vblank
+    frame_rate = 60
+    pacer = None # type: WindowBase
+    # Hidden windows with their renderer and imgui context ready, so
+    # add_window only has to configure and show one. Closed windows are
+    # returned here until the pool is full
+    pool_size = 1
+    _pool = [] # [(glfw window, GlfwImpl, imgui context)]
+
     def add_window(windowbase: WindowBase):
         """Add a window
 
@@ -23,25 +54,175 @@ class Backend:
         """
         Backend.windowqueue.append(windowbase)
 
+    def init_shared():
+        """
+        Create the font atlas and GL context shared by every window.
+        Must be called on the main thread.
+        """
+        if Backend.share_window is not None:
+            return
+        if not glfw.init():
+            sys.exit("Could not initialize GLFW")
+        Monitors.watch(on_change=Backend.monitors_changed)
+
+        Backend._font_context = imgui.create_context()
+        Backend.font_atlas = imgui.get_io().fonts
+        Backend.fonts["default"] = Backend.font_atlas.add_font_default()
+
+        glfw.default_window_hints()
+        Backend.context_hints()
+        glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+        Backend.share_window = glfw.create_window(1, 1, "uxceptional", None, None)
+        if not Backend.share_window:
+            glfw.terminate()
+            sys.exit("Could not create shared OpenGL context")
+        TextureManager.shared_group = Backend.share_group()
+
+    def monitors_changed():
+        """
+        Monitor callback, every docked window is placed again on its next frame
+        """
+        for app_window in Backend.windowlist:
+            app_window.request_redraw()
+
+    def share_group():
+        """
+        Share group identifier of every window's GL context, see TextureManager
+        """
+        return ctypes.cast(Backend.share_window, ctypes.c_void_p).value
+
+    def add_font(name, path, size=13.0):
+        """
+        Register a font for use with imgui.push_font(Backend.fonts[name]).
+        A (path, size) pair is only rasterized once for all windows.
+        Must be called on the main thread, outside of a frame.
+
+        Args:
+            name (str): Registry name
+            path (str): Path to a ttf file
+            size (float): Size in px
+
+        Returns:
+            imgui font
+        """
+        Backend.init_shared()
+        key = (str(path), float(size))
+        if key not in Backend._font_files:
+            Backend._font_files[key] = Backend.font_atlas.add_font_from_file_ttf(
+                str(path), float(size)
+            )
+            Backend._fonts_dirty = GlfwImpl.shared_font_texture is not None
+        Backend.fonts[name] = Backend._font_files[key]
+        return Backend.fonts[name]
+
     def _add_window(windowbase: WindowBase, fontfiles = []):
         """
         Must be called on the main thread.
+        fontfiles are paths, or (path, size) tuples, registered by path
         """
-        shellwindow = windowbase.state
-        shellwindow.context = imgui.create_context()
-        imgui.set_current_context(shellwindow.context)
-        io = imgui.get_io()
+        Backend.init_shared()
         for font in fontfiles:
-            io.fonts.add_font_from_file_ttf(font)
+            path, size = (font, 13.0) if isinstance(font, str) else font
+            Backend.add_font(path, path, size)
+
+        shellwindow = windowbase.state
+        if Backend._pool:
+            window, renderer, context = Backend._pool.pop()
+        else:
+            window, renderer, context = Backend._create_pooled()
+        shellwindow.context = context
+        imgui.set_current_context(context)
+        glfw.make_context_current(window)
+        Backend.configure_window(window, shellwindow)
+        renderer.sync_window_state()
+        renderer.on_event = lambda: windowbase.request_redraw(Backend.input_redraw_frames)
+        renderer.on_visibility = windowbase.set_visible
 
-        window = Backend.glfw_init_window(
-            shellwindow
-        )
-        renderer = GlfwImpl(window)
         shellwindow.window_id = window
         shellwindow.renderer = renderer
         Backend.windowlist.append(windowbase)
-        shellwindow.apply_monitor_preference()
+        Backend.choose_pacer()
+        shellwindow.apply_monitor_preference(renderer.window_pos)
+        Backend.place_window(window, shellwindow, renderer.window_pos)
+        glfw.show_window(window)
+
+    def _create_pooled():
+        """
+        A hidden window with an imgui context and renderer of its own
+        """
+        context = imgui.create_context(Backend.font_atlas)
+        imgui.set_current_context(context)
+        window = Backend.glfw_init_window()
+        return window, GlfwImpl(window), context
+
+    def warm_pool():
+        """
+        Create one hidden window if the pool is not full.
+        Must be called on the main thread.
+
+        Returns:
+            bool: True if a window was created
+        """
+        if len(Backend._pool) >= Backend.pool_size:
+            return False
+        Backend.init_shared()
+        Backend._pool.append(Backend._create_pooled())
+        return True
+
+    def close_window(app_window: WindowBase):
+        """
+        Stop a window and return it to the pool, or destroy it if the pool
+        is full. Its imgui context is destroyed either way.
+        Must be called on the main thread.
+        """
+        state = app_window.state
+        window, impl = state.window_id, state.renderer # type: GlfwImpl
+        Backend.windowlist.remove(app_window)
+        DataScheduler.unregister(app_window)
+        app_window.close_data_cache()
+        glfw.make_context_current(window)
+        app_window.release_textures()
+        glfw.hide_window(window)
+        if len(Backend._pool) < Backend.pool_size:
+            glfw.set_window_should_close(window, False)
+            context = imgui.create_context(Backend.font_atlas)
+            imgui.set_current_context(context)
+            impl.reset()
+            Backend._pool.append((window, impl, context))
+        else:
+            impl.shutdown()
+            glfw.destroy_window(window)
+        imgui.destroy_context(state.context)
+        state.window_id = state.renderer = state.context = None
+        Backend.choose_pacer()
+
+    def configure_window(window, shellwindow: ShellWindow):
+        """
+        Apply a ShellWindow's settings to a (pooled) glfw window
+        """
+        width, height = shellwindow.min_size
+        glfw.set_window_title(window, shellwindow.window_title)
+        glfw.set_window_size(window, int(width), int(height))
+        glfw.set_window_attrib(
+            window, glfw.FOCUS_ON_SHOW,
+            glfw.TRUE if shellwindow.focus_on_show else glfw.FALSE
+        )
+
+    def place_window(window, shellwindow: ShellWindow, window_pos):
+        """
+        Move the window to the position it requested, or its dock position
+        """
+        shellwindow.apply_dock()
+        if tuple(shellwindow.pos) == (-1, -1):
+            return
+        x, y = window_pos
+        req_x, req_y = shellwindow.pos
+        if req_x == -1:
+            req_x = x
+        if req_y == -1:
+            req_y = y
+        if (req_x, req_y) != (x, y):
+            glfw.set_window_pos(window, req_x, req_y)
 
     def add_windows_from_queue():
         """
@@ -52,12 +233,137 @@ class Backend:
         if Backend.windowlist:
             Backend.windowqueue.clear()
 
+    def needs_redraw(app_window: WindowBase):
+        """
+        True if the window has to be drawn this iteration
+        """
+        if not app_window.visible:
+            return False # Iconified, nothing would be shown
+        if not Backend.redraw_on_demand:
+            return True
+        if app_window.data.generation != app_window.frame_generation:
+            return True
+        if app_window.state.renderer.damaged:
+            return True
+        return app_window.animating or app_window.redraw_frames > 0
+
+    def frame_interval(shellwindow: ShellWindow):
+        return 1.0 / (shellwindow.target_fps or Backend.frame_rate)
+
+    def frame_due(shellwindow: ShellWindow, now):
+        """
+        True if the window's next frame is due. A quarter frame of slack
+        keeps windows paced by the vsync swap from skipping every other tick
+        """
+        return now >= shellwindow.next_frame - Backend.frame_interval(shellwindow) / 4
+
+    def schedule_next_frame(shellwindow: ShellWindow, now):
+        """
+        Keep a steady cadence, but don't try to catch up on missed frames
+        """
+        interval = Backend.frame_interval(shellwindow)
+        shellwindow.next_frame = max(shellwindow.next_frame + interval, now)
+
+    def frame_unchanged(app_window: WindowBase):
+        """
+        True if nothing a frame of the window depends on changed,
+        see WindowBase.frame_unchanged
+        """
+        impl = app_window.state.renderer # type: GlfwImpl
+        frame_key = (
+            app_window.data.generation,
+            impl.input_generation,
+            impl.window_size,
+            impl.fb_size,
+            app_window.theme_key(),
+        )
+        return app_window.frame_unchanged(frame_key, Backend.input_redraw_frames)
+
+    def present(impl: GlfwImpl, gl_window):
+        """
+        Draw the draw data of the previous frame again. It stays valid
+        until the next imgui.new_frame of the current context.
+        """
+        gl.glClearColor(0, 0, 0, 0)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        impl.render(imgui.get_draw_data())
+        glfw.swap_buffers(gl_window)
+        impl.damaged = False
+
+    def choose_pacer():
+        """
+        Give vsync to the window with the highest frame rate, or to none
+        """
+        pacer = None
+        if Backend.vsync and Backend.windowlist:
+            pacer = min(
+                Backend.windowlist,
+                key=lambda w: Backend.frame_interval(w.state)
+            )
+        if pacer is Backend.pacer:
+            return
+        old_pacer, Backend.pacer = Backend.pacer, pacer
+        for app_window in (old_pacer, pacer):
+            if app_window is not None and app_window in Backend.windowlist:
+                glfw.make_context_current(app_window.state.window_id)
+                glfw.swap_interval(1 if app_window is pacer else 0)
+
+    def dispatch_events():
+        """
+        Event dispatch stage, run once per tick for every window.
+        Pending events are handed to the owning GlfwImpl by its callbacks.
+        If no window is due to be drawn, block until one is or an event
+        arrives. Data threads wake us through WindowBase.request_redraw
+        """
+        if Backend.windowqueue:
+            return # Windows are about to be created, draw them right away
+        now = glfw.get_time()
+        timeout = Backend.idle_timeout if Backend.redraw_on_demand else None
+        drawable = False
+        for app_window in Backend.windowlist:
+            if not Backend.needs_redraw(app_window):
+                continue
+            drawable = True
+            if Backend.frame_due(app_window.state, now):
+                glfw.poll_events()
+                return
+            wait = app_window.state.next_frame - now
+            timeout = wait if timeout is None else min(timeout, wait)
+        if not drawable: # e.g. every window iconified, nothing to pace
+            timeout = Backend.idle_timeout
+        if timeout is not None:
+            glfw.wait_events_timeout(timeout)
+        else:
+            glfw.poll_events()
+
+    def process_uploads():
+        """
+        Upload textures decoded in the background, spending at most
+        upload_budget_ms per tick. Every window shares GL objects, so this
+        runs once per tick, not once per window
+        """
+        if not TextureManager.pending_uploads():
+            return
+        glfw.make_context_current(Backend.share_window)
+        if TextureManager.process_uploads(Backend.upload_budget_ms):
+            for waiting_window in Backend.windowlist:
+                waiting_window.request_redraw()
+
+    def frame_order():
+        """
+        Windows in drawing order, the pacer last so every other window has
+        swapped before its swap blocks for vblank
+        """
+        return sorted(Backend.windowlist, key=lambda w: w is Backend.pacer)
+
     def run_backend():
-        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+        TextureManager.wake = glfw.post_empty_event
         while Backend.windowlist or Backend.windowqueue:
+            Backend.dispatch_events()
             ## Create windows from queue
             Backend.add_windows_from_queue()
-            for app_window in Backend.windowlist.copy():
+            Backend.process_uploads()
+            for app_window in Backend.frame_order():
                 app_window = app_window  # type: WindowBase
                 window_state = app_window.state
                 gl_window = window_state.window_id
@@ -66,25 +372,44 @@ class Backend:
                 glfw.make_context_current(gl_window)
                 imgui.set_current_context(window_state.context)
                 #endregion
-                
-                glfw.poll_events()
+                if Backend._fonts_dirty:
+                    impl.rebuild_font_texture()
+                    Backend._fonts_dirty = False
+                    for waiting_window in Backend.windowlist:
+                        waiting_window.state.invalidate_layout()
+                        waiting_window.request_redraw()
+
                 if glfw.window_should_close(gl_window):
-                    Backend.windowlist.remove(app_window)
-                    impl.shutdown()
-                    glfw.destroy_window(gl_window)
-                    # TODO: AN IMGUI CONTEXT LEAKS HERE?
+                    Backend.close_window(app_window)
                     continue
 
+                if not Backend.needs_redraw(app_window):
+                    continue
+                now = glfw.get_time()
+                if not Backend.frame_due(window_state, now):
+                    continue
+                Backend.schedule_next_frame(window_state, now)
+                app_window.redraw_frames -= 1
+
+                if Backend.frame_unchanged(app_window):
+                    if impl.damaged:
+                        Backend.present(impl, gl_window)
+                    continue
 
+                frame_start = time.perf_counter()
                 impl.process_inputs()
+                input_done = time.perf_counter()
                 old_size = window_state.size
-                window_state.init() # Reset state for drawing
+                if window_state.needs_monitor_update(impl.window_pos):
+                    window_state.apply_monitor_preference(impl.window_pos)
+                window_state.init(app_window.layout_key()) # Reset state for drawing
                 imgui.new_frame()
-                window_size = glfw.get_window_size(gl_window)
+                window_size = impl.window_size
                 app_window.set_theme()
                 app_window.run_create_window()
                 app_window.unset_theme()
                 window_state.apply_bounds() # Recalculate window size
+                window_state.end_layout()
 
                 #region repositioning and resizing
                 if (tuple(window_state.size) != tuple(old_size) or 
@@ -92,57 +417,68 @@ class Backend:
                     new_size = window_state.size
                     glfw.set_window_size(gl_window, new_size[0], new_size[1])
 
-                if tuple(window_state.pos) != (-1, -1):
-                    x, y = glfw.get_window_pos(gl_window)
-                    req_x, req_y = window_state.pos
-                    if req_x == -1:
-                        req_x = x
-                    if req_y == -1:
-                        req_y = y
-                    if (req_x, req_y) != (x, y):
-                        glfw.set_window_pos(gl_window, req_x, req_y)
+                Backend.place_window(gl_window, window_state, impl.window_pos)
                 #endregion
 
+                imgui.render()
+                build_done = time.perf_counter()
+
                 gl.glClearColor(0, 0, 0, 0)
                 gl.glClear(gl.GL_COLOR_BUFFER_BIT)
-                
-                imgui.render()
                 impl.render(imgui.get_draw_data())
+                render_done = time.perf_counter()
                 glfw.swap_buffers(gl_window)
+                impl.damaged = False
 
-        glfw.terminate()
+                if Stats.enabled:
+                    app_window.frame_stats.add(
+                        (input_done - frame_start) * 1000.0,
+                        (build_done - input_done) * 1000.0,
+                        (render_done - build_done) * 1000.0,
+                        (time.perf_counter() - render_done) * 1000.0,
+                    )
 
-    def glfw_init_window(shellwindow: ShellWindow):
-        CLASS_NAME = "uxceptional"
-        if not glfw.init():
-            sys.exit("Could not initialize GLFW")
+            if not Backend.windowqueue and Backend.windowlist:
+                Backend.warm_pool() # Ready for the next add_window
 
-        width, height = shellwindow.min_size
+        glfw.terminate()
+
+    def context_hints():
+        """
+        Window hints for the OpenGL context, shared windows must match
+        """
         glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
         glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
         glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+        glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, gl.GL_TRUE)
+
+    def glfw_init_window(width=100, height=100, title="uxceptional"):
+        """
+        Create a hidden window sharing GL objects with every other window.
+        Settings that can change later are applied by configure_window
+        """
+        CLASS_NAME = "uxceptional"
+        glfw.default_window_hints()
+        Backend.context_hints()
         glfw.window_hint_string(glfw.X11_CLASS_NAME, CLASS_NAME)
         glfw.window_hint_string(glfw.X11_INSTANCE_NAME, CLASS_NAME)
-        glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, gl.GL_TRUE)
-        
+        glfw.window_hint(glfw.VISIBLE, glfw.FALSE) # Shown by _add_window
+
         # Tell our WM we don't want to tile
         glfw.window_hint(glfw.FLOATING, glfw.TRUE)
         # Enable transparency
         glfw.window_hint(glfw.TRANSPARENT_FRAMEBUFFER, glfw.TRUE)
-        if shellwindow.focus_on_show:
-            glfw.window_hint(glfw.FOCUS_ON_SHOW, glfw.TRUE)
-        
 
         # Create a windowed mode window and its OpenGL context
         window = glfw.create_window(
-            int(width), int(height), shellwindow.window_title, None, None
+            int(width), int(height), title, None,
+            Backend.share_window
         )
-        glfw.make_context_current(window)
-        glfw.swap_interval(1) # enable vsync
-
         if not window:
             glfw.terminate()
-            print(f"Could not initialize Window {shellwindow.window_title}")
+            print(f"Could not initialize Window {title}")
             exit(1)
 
+        glfw.make_context_current(window)
+        glfw.swap_interval(0) # vsync is given to one window, see choose_pacer
         return window
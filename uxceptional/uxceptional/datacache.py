@@ -0,0 +1,81 @@
+"""
+Last known fetcher results of a window, persisted between runs so the first
+frame can show them instead of waiting for every fetcher.
+
+    self.data_cache = DataCache.for_window("statusbar")
+
+Restored values are marked stale in the window's DataStore until a fetcher
+publishes a fresh one, see DataStore.is_stale.
+Only JSON serializable values are kept; tuples come back as lists.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from threading import Lock
+
+from xdg.BaseDirectory import xdg_cache_home
+
+CACHE_VERSION = 1
+
+
+class DataCache:
+    """
+    JSON file of a window's fetcher values, written at most every
+    interval_ms while data changes and once more when the window closes
+    """
+    def __init__(self, path, interval_ms=30000) -> None:
+        self.path = Path(path)
+        self.interval_ms = interval_ms
+        self.saved_at = time.monotonic()
+        self._lock = Lock()
+
+    @staticmethod
+    def for_window(name, interval_ms=30000):
+        """
+        Cache file named after the window in the user's cache directory
+        """
+        return DataCache(os.path.join(xdg_cache_home, "uxceptional", f"data-{name}.json"), interval_ms)
+
+    def load(self):
+        """
+        Returns:
+            dict: Cached values, empty if there is no usable cache
+        """
+        try:
+            with open(self.path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+            return {}
+        return cache.get("values", {})
+
+    def save(self, values):
+        """
+        Write values, skipping any that are not JSON serializable
+        """
+        cache = {"version": CACHE_VERSION, "values": {}}
+        for key, value in values.items():
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                continue
+            if isinstance(key, str):
+                cache["values"][key] = value
+        with self._lock:
+            self.saved_at = time.monotonic()
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp, "w") as f:
+                    json.dump(cache, f)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass # The cache is only an optimization
+
+    def due(self):
+        """
+        True if interval_ms passed since the last save
+        """
+        return time.monotonic() - self.saved_at >= self.interval_ms / 1000.0
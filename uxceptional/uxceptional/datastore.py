@@ -0,0 +1,136 @@
+from collections.abc import MutableMapping
+from threading import Lock
+from types import MappingProxyType
+
+
+class DataStore(MutableMapping):
+    """
+    Versioned window data store shared by the data scheduler and the
+    render thread.
+
+    Readers never lock: every read goes through an immutable snapshot which
+    is swapped in as a whole by writers. Writers serialize on a lock, copy
+    the snapshot, and bump a generation counter for every key whose value
+    actually changed, so widgets can cheaply ask whether a key changed
+    since a given frame.
+
+    Keys can be marked stale, e.g. values restored from a previous run.
+    Publishing a key makes it fresh again, which counts as a change.
+    """
+
+    def __init__(self, initial=None) -> None:
+        self._write_lock = Lock()
+        # (values, key generations, generation) swapped in one assignment
+        self._state = ({}, {}, 0)
+        self._stale = frozenset()
+        if initial:
+            self.update(initial)
+
+    @property
+    def generation(self) -> int:
+        """
+        Counter bumped on every change to any key
+        """
+        return self._state[2]
+
+    def key_generation(self, key) -> int:
+        """
+        Generation at which key last changed, 0 if it was never set
+        """
+        return self._state[1].get(key, 0)
+
+    def changed_since(self, key, generation: int) -> bool:
+        """
+        True if key changed after the store was at generation
+        """
+        return self._state[1].get(key, 0) > generation
+
+    def is_stale(self, key) -> bool:
+        """
+        True if key holds a value that was not published since it was
+        marked stale
+        """
+        return key in self._stale
+
+    def restore(self, values: dict):
+        """
+        Set keys that are not set yet and mark them stale
+        """
+        with self._write_lock:
+            current, generations, generation = self._state
+            restored = {key: value for key, value in values.items() if key not in current}
+            if not restored:
+                return
+            generation += 1
+            current = {**current, **restored}
+            generations = {**generations, **dict.fromkeys(restored, generation)}
+            self._stale = self._stale | restored.keys()
+            self._state = (current, generations, generation)
+
+    def snapshot(self) -> MappingProxyType:
+        """
+        Read only view of the current values. It won't see later writes.
+        """
+        return MappingProxyType(self._state[0])
+
+    def publish(self, key, value) -> bool:
+        """
+        Set key to value. Returns True if the stored value changed.
+        """
+        return self.publish_many({key: value})
+
+    def publish_many(self, values: dict) -> bool:
+        """
+        Set several keys as one new snapshot.
+        Returns True if any stored value changed.
+        """
+        with self._write_lock:
+            current, generations, generation = self._state
+            stale = self._stale
+            changed = [
+                key for key, value in values.items()
+                if key not in current or current[key] != value or key in stale
+            ]
+            if not changed:
+                return False
+            if stale:
+                self._stale = stale - values.keys()
+            generation += 1
+            current = {**current, **values}
+            generations = dict(generations)
+            for key in changed:
+                generations[key] = generation
+            self._state = (current, generations, generation)
+        return True
+
+    def update(self, *args, **kwargs):
+        self.publish_many(dict(*args, **kwargs))
+
+    def __getitem__(self, key):
+        return self._state[0][key]
+
+    def __setitem__(self, key, value):
+        self.publish(key, value)
+
+    def __delitem__(self, key):
+        with self._write_lock:
+            current, generations, generation = self._state
+            if key not in current:
+                raise KeyError(key)
+            generation += 1
+            current = dict(current)
+            del current[key]
+            generations = {**generations, key: generation}
+            self._state = (current, generations, generation)
+
+    def __iter__(self):
+        return iter(self._state[0])
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def __contains__(self, key):
+        return key in self._state[0]
+
+    def __repr__(self):
+        return f"DataStore({self._state[0]!r}, generation={self._state[2]})"
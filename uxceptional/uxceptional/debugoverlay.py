@@ -0,0 +1,58 @@
+import imgui
+from .backend import Backend
+from .instrumentation import FrameStats, Stats
+from .shellwindow import Direction, ShellWindow
+from .windowbase import WindowBase
+
+
+class DebugOverlayWindow(WindowBase):
+    """
+    Live view of the instrumentation of every window, e.g.
+    Backend.add_window(DebugOverlayWindow())
+    """
+    def __init__(self, target_fps=4) -> None:
+        super().__init__()
+        self.state = ShellWindow(
+            window_title="uxceptional debug",
+            min_size=[420, 120],
+            dock_direction=Direction.Top | Direction.Right,
+            target_fps=target_fps,
+        )
+        self.animating = True # Stats change without any data changing
+
+    def create_window(self):
+        state = self.state
+        imgui.set_next_window_size(*state.size)
+        with self.imgui_window("debug overlay"):
+            imgui.text(
+                f"GL uploads: {Stats.texture_uploads} textures "
+                f"({Stats.texture_upload_bytes // 1024} KiB), "
+                f"{Stats.buffer_uploads} buffers "
+                f"({Stats.buffer_upload_bytes // 1024} KiB)"
+            )
+            for window in Backend.windowlist:
+                if window is self:
+                    continue
+                self.window_section(window)
+            state.height_candidate()
+
+    def window_section(self, window: WindowBase):
+        stats = window.frame_stats
+        imgui.separator()
+        imgui.text(f"{window.state.window_title}: {stats.frames} frames")
+        for phase in FrameStats.PHASES + ("total",):
+            samples = getattr(stats, phase)
+            imgui.text(
+                f"  {phase:<6} last {samples.last():6.2f}  mean {samples.mean():6.2f}"
+                f"  max {samples.max():6.2f} ms"
+            )
+        for fetcher in window.fetchers:
+            fetcher_stats = fetcher.stats
+            imgui.text(
+                f"  {fetcher.key}: {fetcher_stats.runs} runs"
+                f"  mean {fetcher_stats.recent.mean():.1f} ms"
+                f"  late {fetcher_stats.lateness.mean():.1f} ms"
+                f"  overruns {fetcher_stats.overruns}"
+                f"  timeouts {fetcher_stats.timeouts}"
+                f"  errors {fetcher_stats.errors}"
+            )
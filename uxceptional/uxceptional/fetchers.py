@@ -0,0 +1,172 @@
+"""
+Fetchers keeping a window's data up to date, run by the DataScheduler.
+Importing them doesn't load any GUI module, so they can be used in data
+only processes.
+"""
+from typing import Any, Type
+import asyncio
+import traceback
+from contextlib import aclosing
+from uxceptional import apputils
+from uxceptional.scheduler import run_fetcher
+from uxceptional.instrumentation import FetcherStats
+from uxceptional.polling import Fixed
+
+class DataFetcher:
+    def __init__(self, key, function : Type[lambda _: Any], delay_ms: int, timeout_ms: int = 5000,
+            share_key=None, policy=None, pause_hidden=False) -> None:
+        """
+        Create a datafetcher instance with a function e.g.
+        async def fn(data):
+            return {"calculated_data": 0}
+
+        where fn is called:
+            data[fetcher.key] = fn(data)
+
+        called every $delay_ms milliseconds.
+        A call running longer than $timeout_ms is cancelled and
+        data[fetcher.key] keeps its previous value.
+
+        Fetchers with the same $share_key (any hashable) are run once for
+        all windows using them, see DataScheduler. fn then gets data of
+        its own instead of the window's.
+
+        $policy decides when the next call happens, see uxceptional.polling,
+        by default every $delay_ms. With $pause_hidden the fetcher stops
+        while no window using it is visible and runs again once one is.
+        """
+        self.key = key
+        self.function = function
+        self.delay = delay_ms
+        self.timeout = timeout_ms
+        self.share_key = share_key
+        self.policy = policy or Fixed()
+        self.pause_hidden = pause_hidden
+        self.value = None # Result of the last run
+        self.changed = False # If the last run changed the stored value
+        self.stats = FetcherStats()
+
+    # Streaming fetchers run for the whole window lifetime instead of
+    # being called every delay_ms, see StreamFetcher
+    streaming = False
+
+class StreamFetcher(DataFetcher):
+    def __init__(self, key, command, parse=None, shell=False,
+            restart_delay_ms: int = 1000, max_restart_delay_ms: int = 30000,
+            share_key=None, on_exit=None) -> None:
+        """
+        Create a datafetcher that keeps a long lived command running e.g.
+        StreamFetcher("volume", ["pactl", "subscribe"], parse=fn)
+        with an optional parse function
+        async def fn(line, data):
+            return {"calculated_data": 0}
+
+        where fn is called for every line the command prints:
+            data[fetcher.key] = fn(line, data)
+
+        Without parse the line itself is stored.
+        If the command exits, can't be started or parse raises, it is
+        restarted after $restart_delay_ms, doubling up to
+        $max_restart_delay_ms while it keeps failing without output.
+        $on_exit, an async fn(data), gives the value stored meanwhile,
+        e.g. a "not running" state.
+        With a $share_key one command serves every window using it.
+        """
+        super().__init__(key, None, 0, share_key=share_key)
+        self.command = command
+        self.parse = parse
+        self.shell = shell
+        self.restart_delay = restart_delay_ms
+        self.max_restart_delay = max_restart_delay_ms
+        self.on_exit = on_exit
+
+    streaming = True
+
+    async def serve(self, window):
+        """
+        Run the command forever, publishing parsed lines to window.data
+        """
+        delay = self.restart_delay
+        while True:
+            try:
+                async with aclosing(apputils.run_stream(self.command, shell=self.shell)) as lines:
+                    async for line in lines:
+                        delay = self.restart_delay
+                        value = line
+                        if self.parse:
+                            value = await self.parse(line, window.data)
+                        window.publish(self.key, value)
+            except Exception:
+                self.stats.errors += 1
+                traceback.print_exc() # e.g. the command is not installed
+            if self.on_exit is not None:
+                try:
+                    window.publish(self.key, await self.on_exit(window.data))
+                except Exception:
+                    self.stats.errors += 1
+                    traceback.print_exc()
+
+            await asyncio.sleep(delay / 1000.0)
+            delay = min(delay * 2, self.max_restart_delay)
+
+class WatchFetcher(DataFetcher):
+    def __init__(self, key, function : Type[lambda _: Any], open_watch,
+            fallback_ms: int = None, debounce_ms: int = 20, timeout_ms: int = 5000,
+            share_key=None) -> None:
+        """
+        Create a datafetcher that runs only when something changed e.g.
+        WatchFetcher("battery", fn, lambda: watch.Uevents("power_supply"))
+        with the same function as DataFetcher
+        async def fn(data):
+            return {"calculated_data": 0}
+
+        $open_watch returns a watch from uxceptional.watch, or anything with
+        fileno(), read() and close(). Its fd is added to the scheduler loop
+        and fn is called once at start and whenever read() returns events,
+        at most every $debounce_ms.
+        With $fallback_ms fn is also called after that long without events,
+        for sources that don't report every change.
+        """
+        super().__init__(key, function, fallback_ms or 0, timeout_ms, share_key=share_key)
+        self.open_watch = open_watch
+        self.fallback = fallback_ms
+        self.debounce = debounce_ms
+
+    streaming = True
+
+    async def serve(self, window):
+        """
+        Run fn whenever the watch reports events, publishing to window.data
+        """
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        watch = self.open_watch()
+        fd = watch.fileno()
+        loop.add_reader(fd, readable.set)
+        try:
+            await self._run(window)
+            while True:
+                timeout = self.fallback / 1000.0 if self.fallback else None
+                try:
+                    await asyncio.wait_for(readable.wait(), timeout)
+                except asyncio.TimeoutError:
+                    await self._run(window)
+                    continue
+                # The fd stays readable until read(), stop watching it
+                # meanwhile or the loop calls readable.set every iteration
+                loop.remove_reader(fd)
+                await asyncio.sleep(self.debounce / 1000.0) # Let bursts arrive
+                readable.clear()
+                events = watch.read()
+                loop.add_reader(fd, readable.set)
+                if events:
+                    await self._run(window)
+        finally:
+            loop.remove_reader(fd)
+            watch.close()
+
+    async def _run(self, window):
+        try:
+            await run_fetcher(window, window.data, self)
+        except Exception:
+            traceback.print_exc() # Keep watching, the next event may work
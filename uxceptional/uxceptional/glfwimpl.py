@@ -3,31 +3,262 @@
 # https://github.com/pyimgui/pyimgui/blob/master/doc/examples/integrations_glfw3.py
 from __future__ import absolute_import
 
+import ctypes
+import hashlib
 import glfw
 import imgui
+import OpenGL.GL as gl
 
 from imgui.integrations import compute_fb_scale
 from imgui.integrations.opengl import ProgrammablePipelineRenderer
 
+from .instrumentation import Stats
+
 
 class GlfwImpl(ProgrammablePipelineRenderer):
-    def __init__(self, window, attach_callbacks=True):
+    # Texture of the font atlas shared by every window's imgui context.
+    # Windows share GL objects, so it is uploaded once, see Backend.font_atlas
+    shared_font_texture = None
+    # Owning impl of every glfw window, events are routed through it because
+    # glfw.poll_events runs once per tick for all windows, see dispatch
+    by_window = {}
+
+    def __init__(self, window, attach_callbacks=True, on_event=None, on_visibility=None):
         super(GlfwImpl, self).__init__()
         self.window = window
+        # Called with no arguments whenever an input or window event arrives
+        self.on_event = on_event
+        # Called with False when the window is iconified and True when restored
+        self.on_visibility = on_visibility
+
+        # Window state kept up to date by callbacks instead of being
+        # queried from the X server every frame
+        self.sync_window_state()
+        self._mouse_held = [False, False, False]
+        self._mouse_pressed = [False, False, False] # Latched until next frame
+        self.input_generation = 0 # Bumped by every event, see WindowBase.frame_unchanged
+        self.damaged = True # Contents were lost and have to be presented again
+
+        # Vertex and index buffers persist between frames and are only
+        # written where a draw list changed, see render
+        self._vbo_capacity = 0
+        self._ibo_capacity = 0
+        self._list_digests = [] # (vertex offset, index offset, digest) per draw list
+        self._render_state = None # (fb size, display size) the context is set up for
 
+        GlfwImpl.by_window[window_key(window)] = self
         if attach_callbacks:
-            glfw.set_key_callback(self.window, self.keyboard_callback)
-            glfw.set_cursor_pos_callback(self.window, self.mouse_callback)
-            glfw.set_window_size_callback(self.window, self.resize_callback)
-            glfw.set_char_callback(self.window, self.char_callback)
-            glfw.set_scroll_callback(self.window, self.scroll_callback)
+            glfw.set_key_callback(self.window, dispatch("keyboard_callback"))
+            glfw.set_cursor_pos_callback(self.window, dispatch("mouse_callback"))
+            glfw.set_window_size_callback(self.window, dispatch("resize_callback"))
+            glfw.set_framebuffer_size_callback(self.window, dispatch("framebuffer_size_callback"))
+            glfw.set_char_callback(self.window, dispatch("char_callback"))
+            glfw.set_scroll_callback(self.window, dispatch("scroll_callback"))
+            glfw.set_mouse_button_callback(self.window, dispatch("mouse_button_callback"))
+            glfw.set_cursor_enter_callback(self.window, dispatch("cursor_enter_callback"))
+            glfw.set_window_focus_callback(self.window, dispatch("focus_callback"))
+            glfw.set_window_pos_callback(self.window, dispatch("pos_callback"))
+            glfw.set_window_refresh_callback(self.window, dispatch("refresh_callback"))
+            glfw.set_window_iconify_callback(self.window, dispatch("iconify_callback"))
 
-        self.io.display_size = glfw.get_framebuffer_size(self.window)
+        self._setup_io()
+        self._gui_time = None
+
+    def _setup_io(self):
+        self.io.display_size = self.window_size
+        self.io.display_fb_scale = compute_fb_scale(self.window_size, self.fb_size)
         self.io.get_clipboard_text_fn = self._get_clipboard_text
         self.io.set_clipboard_text_fn = self._set_clipboard_text
-
+        self.io.fonts.texture_id = self._font_texture
         self._map_keys()
+
+    def sync_window_state(self):
+        """
+        Query the window state that callbacks keep up to date afterwards
+        """
+        self.window_size = glfw.get_window_size(self.window)
+        self.fb_size = glfw.get_framebuffer_size(self.window)
+        self.window_pos = glfw.get_window_pos(self.window)
+        self.focused = bool(glfw.get_window_attrib(self.window, glfw.FOCUSED))
+
+    def reset(self):
+        """
+        Forget the window that used this renderer and bind it to the
+        current imgui context, for reuse by another window. GL objects
+        are kept, see Backend.close_window
+        """
+        self.io = imgui.get_io()
+        self.on_event = None
+        self.on_visibility = None
+        self._mouse_held = [False, False, False]
+        self._mouse_pressed = [False, False, False]
         self._gui_time = None
+        self.damaged = True
+        self._list_digests = []
+        self._render_state = None
+        self.sync_window_state()
+        self._setup_io()
+
+    def shutdown(self):
+        GlfwImpl.by_window.pop(window_key(self.window), None)
+        super(GlfwImpl, self).shutdown()
+
+    def refresh_font_texture(self):
+        if GlfwImpl.shared_font_texture is None:
+            super(GlfwImpl, self).refresh_font_texture()
+            GlfwImpl.shared_font_texture = self._font_texture
+            self._count_font_upload()
+        self._font_texture = GlfwImpl.shared_font_texture
+        self.io.fonts.texture_id = self._font_texture
+
+    def rebuild_font_texture(self):
+        """
+        Rasterize the shared font atlas again after fonts were added
+        """
+        self._font_texture = GlfwImpl.shared_font_texture
+        super(GlfwImpl, self).refresh_font_texture()
+        GlfwImpl.shared_font_texture = self._font_texture
+        self._count_font_upload()
+
+    def _count_font_upload(self):
+        fonts = self.io.fonts
+        Stats.count_texture_upload(fonts.texture_width * fonts.texture_height * 4)
+
+    def _invalidate_device_objects(self):
+        # Unlike the base class, leave the shared font texture alone
+        gl.glDeleteVertexArrays(1, [self._vao_handle])
+        gl.glDeleteBuffers(1, [self._vbo_handle])
+        gl.glDeleteBuffers(1, [self._elements_handle])
+        gl.glDeleteProgram(self._shader_handle)
+        self._vao_handle = self._vbo_handle = self._elements_handle = 0
+        self._shader_handle = 0
+        self._vbo_capacity = self._ibo_capacity = 0
+        self._list_digests = []
+        self._render_state = None
+
+    def render(self, draw_data):
+        """
+        Draw imgui draw data.
+
+        Unlike the base class this doesn't back up and restore GL state:
+        every window has a context of its own that only the backend draws
+        with, so blending, program and vertex array are set up once per
+        context. Draw lists are uploaded only when their contents changed.
+        """
+        io = self.io
+        display_width, display_height = io.display_size
+        fb_width = int(display_width * io.display_fb_scale[0])
+        fb_height = int(display_height * io.display_fb_scale[1])
+
+        if fb_width == 0 or fb_height == 0:
+            return
+
+        # Clip rects are scaled here instead of with draw_data.scale_clip_rects,
+        # which changes the draw data that Backend.present draws again
+        scale_x, scale_y = io.display_fb_scale
+        render_state = (fb_width, fb_height, display_width, display_height)
+        if render_state != self._render_state:
+            self._setup_render_state(*render_state)
+
+        draw_lists = self._upload_draw_lists(draw_data)
+
+        if imgui.INDEX_SIZE == 2:
+            gltype = gl.GL_UNSIGNED_SHORT
+        else:
+            gltype = gl.GL_UNSIGNED_INT
+
+        gl.glEnable(gl.GL_SCISSOR_TEST)
+        bound_texture = None
+        for commands, base_vertex, idx_buffer_offset in draw_lists:
+            for command in commands.commands:
+                if command.texture_id != bound_texture:
+                    bound_texture = command.texture_id
+                    gl.glBindTexture(gl.GL_TEXTURE_2D, bound_texture)
+
+                x, y, z, w = command.clip_rect
+                gl.glScissor(
+                    int(x * scale_x), int(fb_height - w * scale_y),
+                    int((z - x) * scale_x), int((w - y) * scale_y)
+                )
+                gl.glDrawElementsBaseVertex(
+                    gl.GL_TRIANGLES, command.elem_count, gltype,
+                    ctypes.c_void_p(idx_buffer_offset), base_vertex
+                )
+                idx_buffer_offset += command.elem_count * imgui.INDEX_SIZE
+        # The backend clears the whole framebuffer before the next frame
+        gl.glDisable(gl.GL_SCISSOR_TEST)
+
+    def _setup_render_state(self, fb_width, fb_height, display_width, display_height):
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendEquation(gl.GL_FUNC_ADD)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+        gl.glDisable(gl.GL_CULL_FACE)
+        gl.glDisable(gl.GL_DEPTH_TEST)
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+        gl.glViewport(0, 0, fb_width, fb_height)
+
+        ortho_projection = (ctypes.c_float * 16)(
+             2.0/display_width, 0.0,                   0.0, 0.0,
+             0.0,               2.0/-display_height,   0.0, 0.0,
+             0.0,               0.0,                  -1.0, 0.0,
+            -1.0,               1.0,                   0.0, 1.0
+        )
+        gl.glUseProgram(self._shader_handle)
+        gl.glUniform1i(self._attrib_location_tex, 0)
+        gl.glUniformMatrix4fv(self._attrib_proj_mtx, 1, gl.GL_FALSE, ortho_projection)
+        gl.glBindVertexArray(self._vao_handle)
+        # The base class never attaches the element buffer to the vertex
+        # array, bound here it is part of the vertex array state
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self._elements_handle)
+        self._render_state = (fb_width, fb_height, display_width, display_height)
+
+    def _upload_draw_lists(self, draw_data):
+        """
+        Pack every draw list into the persistent buffers, growing them if
+        needed, and write only the lists that differ from the last frame
+
+        Returns:
+            list: (draw list, base vertex, index byte offset) per draw list
+        """
+        layout = []
+        vtx_total = idx_total = 0
+        for commands in draw_data.commands_lists:
+            vtx_size = commands.vtx_buffer_size * imgui.VERTEX_SIZE
+            idx_size = commands.idx_buffer_size * imgui.INDEX_SIZE
+            layout.append((commands, vtx_total, idx_total, vtx_size, idx_size))
+            vtx_total += vtx_size
+            idx_total += idx_size
+
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self._vbo_handle)
+        # The element buffer is bound with the vertex array, see _setup_render_state
+        if vtx_total > self._vbo_capacity or idx_total > self._ibo_capacity:
+            self._vbo_capacity = buffer_capacity(vtx_total)
+            self._ibo_capacity = buffer_capacity(idx_total)
+            gl.glBufferData(gl.GL_ARRAY_BUFFER, self._vbo_capacity, None, gl.GL_DYNAMIC_DRAW)
+            gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, self._ibo_capacity, None, gl.GL_DYNAMIC_DRAW)
+            self._list_digests = []
+
+        digests = []
+        draw_lists = []
+        for index, (commands, vtx_offset, idx_offset, vtx_size, idx_size) in enumerate(layout):
+            digest = (vtx_offset, idx_offset, draw_list_digest(commands, vtx_size, idx_size))
+            digests.append(digest)
+            draw_lists.append((commands, vtx_offset // imgui.VERTEX_SIZE, idx_offset))
+            if index < len(self._list_digests) and self._list_digests[index] == digest:
+                continue
+            gl.glBufferSubData(
+                gl.GL_ARRAY_BUFFER, vtx_offset, vtx_size,
+                ctypes.c_void_p(commands.vtx_buffer_data)
+            )
+            gl.glBufferSubData(
+                gl.GL_ELEMENT_ARRAY_BUFFER, idx_offset, idx_size,
+                ctypes.c_void_p(commands.idx_buffer_data)
+            )
+            if Stats.enabled:
+                Stats.count_buffer_upload(vtx_size)
+                Stats.count_buffer_upload(idx_size)
+        self._list_digests = digests
+        return draw_lists
 
     def _get_clipboard_text(self):
         return glfw.get_clipboard_string(self.window)
@@ -58,7 +289,18 @@ class GlfwImpl(ProgrammablePipelineRenderer):
         key_map[imgui.KEY_Y] = glfw.KEY_Y
         key_map[imgui.KEY_Z] = glfw.KEY_Z
 
+    def event_callback(self, *args):
+        self.input_generation += 1
+        if self.on_event:
+            self.on_event()
+
+    def refresh_callback(self, window):
+        # Only the pixels were lost, the frame itself is still valid.
+        # Backend.needs_redraw picks this up
+        self.damaged = True
+
     def keyboard_callback(self, window, key, scancode, action, mods):
+        self.event_callback()
         # perf: local for faster access
         io = self.io
 
@@ -88,38 +330,71 @@ class GlfwImpl(ProgrammablePipelineRenderer):
         )
 
     def char_callback(self, window, char):
-        io = imgui.get_io()
+        self.event_callback()
+        # Not imgui.get_io(), another window's context may be current
+        io = self.io
 
         if 0 < char < 0x10000:
             io.add_input_character(char)
 
     def resize_callback(self, window, width, height):
+        self.event_callback()
+        self.window_size = (width, height)
         self.io.display_size = width, height
 
+    def iconify_callback(self, window, iconified):
+        if self.on_visibility:
+            self.on_visibility(not iconified)
+
+    def framebuffer_size_callback(self, window, width, height):
+        self.damaged = True
+        self.event_callback()
+        self.fb_size = (width, height)
+
+    def pos_callback(self, window, x, y):
+        self.event_callback()
+        self.window_pos = (x, y)
+
+    def focus_callback(self, window, focused):
+        self.event_callback()
+        self.focused = bool(focused)
+
+    def cursor_enter_callback(self, window, entered):
+        self.event_callback()
+        if not entered:
+            self.io.mouse_pos = (-FLT_MAX, -FLT_MAX)
+
     def mouse_callback(self, *args, **kwargs):
+        self.event_callback()
         _, x, y  = args
         self.io.mouse_pos = (x, y)
 
+    def mouse_button_callback(self, window, button, action, mods):
+        self.event_callback()
+        if 0 <= button < len(self._mouse_held):
+            self._mouse_held[button] = action == glfw.PRESS
+            if action == glfw.PRESS:
+                self._mouse_pressed[button] = True
+
     def scroll_callback(self, window, x_offset, y_offset):
+        self.event_callback()
         self.io.mouse_wheel_horizontal = x_offset
         self.io.mouse_wheel = y_offset
 
     def process_inputs(self):
-        io = imgui.get_io()
-
-        window_size = glfw.get_window_size(self.window)
-        fb_size = glfw.get_framebuffer_size(self.window)
-
-        io.display_size = window_size
-        io.display_fb_scale = compute_fb_scale(window_size, fb_size)
-        io.delta_time = 1.0/60
+        """
+        Feed the state collected by callbacks to imgui, no glfw queries
+        """
+        io = self.io
 
-        if glfw.get_window_attrib(self.window, glfw.FOCUSED):
-            io.mouse_pos = glfw.get_cursor_pos(self.window)
+        io.display_size = self.window_size
+        io.display_fb_scale = compute_fb_scale(self.window_size, self.fb_size)
 
-        io.mouse_down[0] = glfw.get_mouse_button(self.window, 0)
-        io.mouse_down[1] = glfw.get_mouse_button(self.window, 1)
-        io.mouse_down[2] = glfw.get_mouse_button(self.window, 2)
+        # A click that was pressed and released between two frames
+        # still counts as down for one frame
+        for button in range(len(self._mouse_held)):
+            io.mouse_down[button] = self._mouse_held[button] or self._mouse_pressed[button]
+            self._mouse_pressed[button] = False
 
         current_time = glfw.get_time()
 
@@ -129,3 +404,47 @@ class GlfwImpl(ProgrammablePipelineRenderer):
             self.io.delta_time = 1. / 60.
 
         self._gui_time = current_time
+
+
+FLT_MAX = 3.402823466e+38 # imgui reads -FLT_MAX as "mouse not available"
+
+
+def buffer_capacity(size):
+    """
+    Buffer size for size bytes, rounded up to a power of two so
+    buffers only grow a few times
+    """
+    capacity = 64 * 1024
+    while capacity < size:
+        capacity *= 2
+    return capacity
+
+
+def draw_list_digest(commands, vtx_size, idx_size):
+    """
+    Digest of a draw list's vertices and indices, read in place
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if vtx_size:
+        digest.update((ctypes.c_char * vtx_size).from_address(commands.vtx_buffer_data))
+    if idx_size:
+        digest.update((ctypes.c_char * idx_size).from_address(commands.idx_buffer_data))
+    return digest.digest()
+
+
+def window_key(window):
+    """
+    Hashable identity of a glfw window pointer
+    """
+    return ctypes.cast(window, ctypes.c_void_p).value
+
+
+def dispatch(method):
+    """
+    glfw callback routing an event to the GlfwImpl that owns the window
+    """
+    def callback(window, *args):
+        impl = GlfwImpl.by_window.get(window_key(window))
+        if impl is not None:
+            getattr(impl, method)(window, *args)
+    return callback
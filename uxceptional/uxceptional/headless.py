@@ -0,0 +1,132 @@
+"""
+Backend without a display, for tests and benchmarks.
+
+Windows are built against a real imgui context, but nothing is drawn:
+frames stop at imgui.render and the draw data is only counted.
+No glfw window or GL context is ever created, so this runs without an
+X server. Docked windows are placed on a single monitor with workarea.
+Anything that needs GL (textures, fonts added later) has to be
+provided by the caller, e.g. Texture objects with a dummy texture_id.
+"""
+import time
+import imgui
+from .instrumentation import Stats
+from .scheduler import DataScheduler
+from .shellwindow import Monitor, Monitors
+from .windowbase import WindowBase
+
+
+class FrameInfo:
+    """
+    Size of the draw data of one headless frame
+    """
+    def __init__(self, draw_data) -> None:
+        self.draw_lists = 0
+        self.vertices = 0
+        self.indices = 0
+        self.commands = 0
+        for commands in draw_data.commands_lists:
+            self.draw_lists += 1
+            self.vertices += commands.vtx_buffer_size
+            self.indices += commands.idx_buffer_size
+            self.commands += len(commands.commands)
+
+
+class HeadlessBackend:
+    windowlist = []
+    font_atlas = None # Shared by the imgui context of every window
+    _font_context = None # Owns font_atlas
+    FONT_TEXTURE_ID = 1 # Nothing samples it, imgui only needs an ID
+    settle_frames = 3 # See WindowBase.frame_unchanged
+    workarea = (0, 0, 1920, 1080) # Of the only monitor
+
+    def init_shared():
+        if HeadlessBackend.font_atlas is not None:
+            return
+        HeadlessBackend._font_context = imgui.create_context()
+        HeadlessBackend.font_atlas = imgui.get_io().fonts
+        HeadlessBackend.font_atlas.add_font_default()
+        HeadlessBackend.font_atlas.get_tex_data_as_rgba32() # Build the atlas
+        HeadlessBackend.font_atlas.texture_id = HeadlessBackend.FONT_TEXTURE_ID
+
+    def add_window(windowbase: WindowBase, run_fetchers=False):
+        """
+        Create an imgui context for a window.
+
+        Args:
+            windowbase (WindowBase): Window to add
+            run_fetchers (bool): If false, neither the window's fetchers nor
+                its init_hook run. Seed windowbase.data and
+                windowbase.textures instead, which keeps frames
+                deterministic.
+        """
+        HeadlessBackend.init_shared()
+        if not Monitors.is_cached(): # Never query glfw, keep a layout set by the caller
+            Monitors.set_layout([Monitor(None, "headless", (0, 0), HeadlessBackend.workarea, primary=True)])
+        shellwindow = windowbase.state
+        shellwindow.context = imgui.create_context(HeadlessBackend.font_atlas)
+        imgui.set_current_context(shellwindow.context)
+        imgui.get_io().ini_file_name = b"" # Don't write imgui.ini to the cwd
+        if not run_fetchers:
+            windowbase.initialized = True
+        HeadlessBackend.windowlist.append(windowbase)
+
+    def remove_window(windowbase: WindowBase):
+        HeadlessBackend.windowlist.remove(windowbase)
+        DataScheduler.unregister(windowbase)
+        windowbase.close_data_cache()
+        imgui.destroy_context(windowbase.state.context)
+        windowbase.state.context = None
+
+    def render_frame(windowbase: WindowBase, delta_time=1.0 / 60.0) -> FrameInfo:
+        """
+        Build one frame of a window, like Backend.run_backend does,
+        and record its build time in windowbase.frame_stats.
+        Unchanged retained windows reuse their previous draw data
+        """
+        window_state = windowbase.state
+        imgui.set_current_context(window_state.context)
+        io = imgui.get_io()
+        # The display follows the size the window asked for last frame,
+        # as if the window manager honoured every resize
+        io.display_size = tuple(window_state.size)
+        io.delta_time = delta_time
+
+        frame_start = time.perf_counter()
+        frame_key = (
+            windowbase.data.generation, tuple(window_state.size),
+            Monitors.generation, windowbase.theme_key(),
+        )
+        if windowbase.frame_unchanged(frame_key, HeadlessBackend.settle_frames):
+            if Stats.enabled:
+                windowbase.frame_stats.add(0.0, (time.perf_counter() - frame_start) * 1000.0, 0.0, 0.0)
+            return FrameInfo(imgui.get_draw_data())
+
+        if window_state.needs_monitor_update():
+            window_state.apply_monitor_preference()
+        window_state.init(windowbase.layout_key())
+        imgui.new_frame()
+        windowbase.set_theme()
+        windowbase.run_create_window()
+        windowbase.unset_theme()
+        window_state.apply_bounds()
+        window_state.end_layout()
+        window_state.apply_dock()
+        imgui.render()
+        build_time = (time.perf_counter() - frame_start) * 1000.0
+        if Stats.enabled:
+            windowbase.frame_stats.add(0.0, build_time, 0.0, 0.0)
+        return FrameInfo(imgui.get_draw_data())
+
+    def run_frames(frames=1, delta_time=1.0 / 60.0):
+        """
+        Build frames of every window
+
+        Returns:
+            dict: window -> FrameInfo of its last frame
+        """
+        last = {}
+        for _ in range(frames):
+            for windowbase in HeadlessBackend.windowlist:
+                last[windowbase] = HeadlessBackend.render_frame(windowbase, delta_time)
+        return last
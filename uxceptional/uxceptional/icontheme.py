@@ -0,0 +1,259 @@
+"""
+Indexed icon theme lookup.
+
+xdg.IconTheme.getIconPath walks the theme directories on every call.
+IconIndex scans the theme and everything it inherits from once, keeps a
+name -> candidates map, and persists it to a cache file which is checked
+against directory mtimes in the background.
+"""
+import json
+import os
+from pathlib import Path
+from threading import Lock, Thread
+import xdg.Config
+from xdg import IconTheme
+from xdg.BaseDirectory import xdg_cache_home
+
+EXTENSIONS = ["png", "svg", "xpm"]
+CACHE_VERSION = 1
+
+
+class IconIndex:
+    """
+    Icons of a theme chain, looked up like the icon theme spec does it:
+    the first theme with the icon wins, an exact size match is preferred
+    over the closest size, and unthemed icons come last.
+    """
+    def __init__(self, theme, icondirs=None, cache_file=None) -> None:
+        self.theme = theme
+        self.icondirs = list(IconTheme.icondirs if icondirs is None else icondirs)
+        self.cache_file = cache_file
+        # name -> [(rank, type, size, min size, max size, threshold, path)]
+        self.icons = {}
+        self.mtimes = {} # scanned directory -> mtime, None if it was missing
+        self._refresh_lock = Lock()
+
+    def load(self, background=True):
+        """
+        Load the index from the cache file, or scan if there is none.
+        A cached index is used right away and validated in the background
+        (or right away with background=False), then rescanned if stale.
+        """
+        if not self._read_cache():
+            self.scan()
+            return
+        if background:
+            Thread(target=self.refresh, name="uxceptional-icons", daemon=True).start()
+        else:
+            self.refresh()
+
+    def is_stale(self):
+        return any(mtime(path) != recorded for path, recorded in self.mtimes.items())
+
+    def refresh(self):
+        """
+        Rescan if any indexed directory changed since the index was built
+        """
+        with self._refresh_lock:
+            if self.is_stale():
+                self.scan()
+
+    def scan(self):
+        """
+        Build the index from the filesystem and write the cache file
+        """
+        icons = {}
+        mtimes = {}
+        chain = theme_chain(self.theme, self.icondirs)
+        for rank, theme in enumerate(chain):
+            for base in self.icondirs:
+                root = os.path.join(base, theme.name)
+                mtimes[root] = mtime(root)
+                for subdir in theme.getDirectories():
+                    directory = os.path.join(root, subdir)
+                    mtimes[directory] = mtime(directory)
+                    if mtimes[directory] is None:
+                        continue
+                    attributes = (
+                        rank,
+                        theme.getType(subdir),
+                        theme.getSize(subdir),
+                        theme.getMinSize(subdir),
+                        theme.getMaxSize(subdir),
+                        theme.getThreshold(subdir),
+                    )
+                    add_files(icons, directory, attributes)
+
+        # Icons straight in the base directories e.g. /usr/share/pixmaps
+        for base in self.icondirs:
+            mtimes[base] = mtime(base)
+            if mtimes[base] is not None:
+                add_files(icons, base, (len(chain), "Unthemed", 0, 0, 0, 0))
+
+        for candidates in icons.values():
+            candidates.sort(key=lambda entry: (entry[0], extension_rank(entry[6])))
+        # Swap in one assignment, lookups may run on other threads
+        self.icons, self.mtimes = icons, mtimes
+        self._write_cache()
+
+    def lookup(self, icon_name, icon_size):
+        """
+        Returns:
+            str: Path of the best icon or None
+        """
+        if os.path.isabs(icon_name):
+            return icon_name
+        stem, extension = os.path.splitext(icon_name)
+        if extension[1:] in EXTENSIONS:
+            icon_name = stem
+
+        candidates = self.icons.get(icon_name)
+        if not candidates:
+            return None
+        rank = candidates[0][0]
+        best = None
+        best_distance = None
+        for entry in candidates:
+            if entry[0] != rank:
+                break
+            if matches_size(entry, icon_size):
+                return entry[6]
+            distance = size_distance(entry, icon_size)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = entry[6], distance
+        return best
+
+    def _read_cache(self):
+        if not self.cache_file:
+            return False
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cache.get("version") != CACHE_VERSION or cache.get("icondirs") != self.icondirs:
+            return False
+        self.icons = {name: [tuple(entry) for entry in entries] for name, entries in cache["icons"].items()}
+        self.mtimes = cache["mtimes"]
+        return True
+
+    def _write_cache(self):
+        if not self.cache_file:
+            return
+        cache = {
+            "version": CACHE_VERSION,
+            "icondirs": self.icondirs,
+            "mtimes": self.mtimes,
+            "icons": self.icons,
+        }
+        path = Path(self.cache_file)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass # The cache is only an optimization
+
+
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def extension_rank(path):
+    return EXTENSIONS.index(os.path.splitext(path)[1][1:])
+
+
+def add_files(icons, directory, attributes):
+    for filename in os.listdir(directory):
+        stem, extension = os.path.splitext(filename)
+        if extension[1:] in EXTENSIONS:
+            icons.setdefault(stem, []).append(
+                attributes + (os.path.join(directory, filename),)
+            )
+
+
+def theme_chain(theme_name, icondirs):
+    """
+    Parsed themes of theme_name and the themes it inherits, without
+    duplicates, ending with hicolor.
+    """
+    chain = []
+    pending = [theme_name]
+    while pending:
+        name = pending.pop(0)
+        if name in [theme.name for theme in chain]:
+            continue
+        for base in icondirs:
+            index_file = os.path.join(base, name, "index.theme")
+            if os.path.isfile(index_file):
+                theme = IconTheme.IconTheme()
+                theme.parse(index_file)
+                chain.append(theme)
+                pending.extend(theme.getInherits())
+                break
+        if not pending and "hicolor" not in [theme.name for theme in chain] + [name]:
+            pending.append("hicolor")
+    return chain
+
+
+def matches_size(entry, size):
+    _, kind, dir_size, min_size, max_size, threshold, _ = entry
+    if kind == "Fixed":
+        return dir_size == size
+    if kind == "Scalable":
+        return min_size <= size <= max_size
+    if kind == "Threshold":
+        return dir_size - threshold <= size <= dir_size + threshold
+    return False
+
+
+def size_distance(entry, size):
+    _, kind, dir_size, min_size, max_size, threshold, _ = entry
+    if kind == "Fixed":
+        return abs(dir_size - size)
+    if kind == "Scalable":
+        if size < min_size:
+            return min_size - size
+        if size > max_size:
+            return size - max_size
+        return 0
+    if kind == "Threshold":
+        if size < dir_size - threshold:
+            return min_size - size
+        if size > dir_size + threshold:
+            return size - max_size
+        return 0
+    return 2**31 # Unthemed, any size
+
+
+_indexes = {}
+_indexes_lock = Lock()
+
+
+def get_index(theme=None) -> IconIndex:
+    """
+    The shared, loaded index of a theme (xdg.Config.icon_theme if None)
+    """
+    if theme is None:
+        theme = xdg.Config.icon_theme
+    with _indexes_lock:
+        if theme not in _indexes:
+            index = IconIndex(
+                theme,
+                cache_file=os.path.join(xdg_cache_home, "uxceptional", f"icons-{theme}.json")
+            )
+            index.load()
+            _indexes[theme] = index
+        return _indexes[theme]
+
+
+def lookup_icon(icon_name, icon_size, theme=None):
+    """
+    Path of an icon in the theme, None if it can't be found
+    """
+    return get_index(theme).lookup(icon_name, icon_size)
@@ -0,0 +1,189 @@
+"""
+Always-on timing instrumentation.
+
+Samples go into preallocated arrays, so recording one costs an index
+update and a store. Every window has a FrameStats (WindowBase.frame_stats)
+and every DataFetcher a FetcherStats (DataFetcher.stats). Process wide
+counters live on Stats. See debugoverlay.DebugOverlayWindow for an
+in-shell view.
+"""
+from array import array
+from bisect import bisect_left
+
+
+class RingBuffer:
+    """
+    Fixed size buffer of the last `size` float samples
+    """
+    def __init__(self, size=256) -> None:
+        self.samples = array("d", bytes(8 * size))
+        self.size = size
+        self.index = 0
+        self.count = 0
+
+    def add(self, value):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def values(self):
+        """
+        Samples oldest first
+        """
+        if self.count < self.size:
+            return self.samples[:self.count]
+        return self.samples[self.index:] + self.samples[:self.index]
+
+    def last(self):
+        if not self.count:
+            return 0.0
+        return self.samples[self.index - 1]
+
+    def mean(self):
+        if not self.count:
+            return 0.0
+        return sum(self.samples[:self.count]) / self.count
+
+    def max(self):
+        if not self.count:
+            return 0.0
+        return max(self.samples[:self.count])
+
+    def percentile(self, percent):
+        if not self.count:
+            return 0.0
+        ordered = sorted(self.samples[:self.count])
+        return ordered[min(int(len(ordered) * percent / 100.0), len(ordered) - 1)]
+
+
+class Histogram:
+    """
+    Counts of samples per bucket, bucket i holds values <= bounds[i],
+    the last bucket everything above
+    """
+    def __init__(self, bounds) -> None:
+        self.bounds = list(bounds)
+        self.counts = array("Q", bytes(8 * (len(self.bounds) + 1)))
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+
+    def buckets(self):
+        """
+        Returns:
+            list[tuple[str, int]]: Bucket label and count
+        """
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return list(zip(labels, self.counts))
+
+
+class FrameStats:
+    """
+    Per window frame phase timings in milliseconds
+    """
+    PHASES = ("input", "build", "render", "swap")
+
+    def __init__(self, size=256) -> None:
+        self.input = RingBuffer(size)
+        self.build = RingBuffer(size) # new_frame, create_window, imgui.render
+        self.render = RingBuffer(size) # GL submission
+        self.swap = RingBuffer(size)
+        self.total = RingBuffer(size)
+        self.frames = 0
+
+    def add(self, input_ms, build_ms, render_ms, swap_ms):
+        self.input.add(input_ms)
+        self.build.add(build_ms)
+        self.render.add(render_ms)
+        self.swap.add(swap_ms)
+        self.total.add(input_ms + build_ms + render_ms + swap_ms)
+        self.frames += 1
+
+    def summary(self):
+        return {
+            "frames": self.frames,
+            **{
+                phase: {
+                    "mean": getattr(self, phase).mean(),
+                    "max": getattr(self, phase).max(),
+                }
+                for phase in FrameStats.PHASES + ("total",)
+            }
+        }
+
+
+class FetcherStats:
+    """
+    Per fetcher run time histogram and scheduling lateness in milliseconds
+    """
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self, size=64) -> None:
+        self.duration = Histogram(FetcherStats.BOUNDS_MS)
+        self.recent = RingBuffer(size) # last run times
+        self.lateness = RingBuffer(size) # how late runs started after their due time
+        self.runs = 0
+        self.overruns = 0 # runs that took longer than the fetcher's delay
+        self.timeouts = 0
+        self.errors = 0
+
+    def add_run(self, duration_ms, delay_ms):
+        self.duration.add(duration_ms)
+        self.recent.add(duration_ms)
+        self.runs += 1
+        if delay_ms and duration_ms > delay_ms:
+            self.overruns += 1
+
+    def summary(self):
+        return {
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "duration_mean": self.recent.mean(),
+            "duration_max": self.recent.max(),
+            "lateness_mean": self.lateness.mean(),
+            "lateness_max": self.lateness.max(),
+            "histogram": self.duration.buckets(),
+        }
+
+
+class Stats:
+    """
+    Process wide counters and the instrumentation switch
+    """
+    enabled = True
+    texture_uploads = 0
+    texture_upload_bytes = 0
+    buffer_uploads = 0
+    buffer_upload_bytes = 0
+
+    def count_texture_upload(nbytes):
+        Stats.texture_uploads += 1
+        Stats.texture_upload_bytes += nbytes
+
+    def count_buffer_upload(nbytes):
+        Stats.buffer_uploads += 1
+        Stats.buffer_upload_bytes += nbytes
+
+    def summary(windows):
+        """
+        Everything recorded for windows (e.g. Backend.windowlist) as a dict
+        """
+        return {
+            "texture_uploads": Stats.texture_uploads,
+            "texture_upload_bytes": Stats.texture_upload_bytes,
+            "buffer_uploads": Stats.buffer_uploads,
+            "buffer_upload_bytes": Stats.buffer_upload_bytes,
+            "windows": {
+                window.state.window_title: {
+                    "frames": window.frame_stats.summary(),
+                    "fetchers": {
+                        fetcher.key: fetcher.stats.summary()
+                        for fetcher in window.fetchers
+                    },
+                }
+                for window in windows
+            },
+        }
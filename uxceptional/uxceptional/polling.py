@@ -0,0 +1,67 @@
+"""
+Polling policies, deciding when a DataFetcher runs next.
+
+    DataFetcher("spotify", fn, delay_ms=1000,
+        policy=Backoff(max_ms=10000, idle=lambda value: value["state"] == "Stopped"))
+
+A policy keeps state about its fetcher, so every fetcher needs an
+instance of its own.
+"""
+import time
+
+
+class Fixed:
+    """
+    Every delay_ms, counted from the start of the previous run
+    """
+    def next_due(self, fetcher, started, now):
+        """
+        Args:
+            fetcher (DataFetcher): Fetcher that just ran, fetcher.changed
+                and fetcher.value describe the result
+            started (float): Scheduler loop time the run started
+            now (float): Scheduler loop time
+
+        Returns:
+            float: Scheduler loop time of the next run
+        """
+        return max(started + fetcher.delay / 1000.0, now)
+
+
+class Backoff(Fixed):
+    """
+    Multiply the delay by factor every time the result did not change, up
+    to max_ms, and go back to delay_ms as soon as it does.
+    If idle(value) is true the source has nothing to report (e.g. a player
+    that is not running) and the delay jumps to max_ms right away.
+    """
+    def __init__(self, max_ms=30000, factor=2.0, idle=None) -> None:
+        self.max_ms = max_ms
+        self.factor = factor
+        self.idle = idle
+        self.delay_ms = None # Current delay, None until the first run
+
+    def next_due(self, fetcher, started, now):
+        if self.idle is not None and fetcher.value is not None and self.idle(fetcher.value):
+            self.delay_ms = self.max_ms
+        elif fetcher.changed or self.delay_ms is None:
+            self.delay_ms = fetcher.delay
+        else:
+            self.delay_ms = min(self.delay_ms * self.factor, self.max_ms)
+        return max(started + self.delay_ms / 1000.0, now)
+
+
+class Aligned(Fixed):
+    """
+    Run right after wall clock multiples of period_ms, e.g. every full
+    second for a clock showing seconds, or every minute for one that doesn't.
+    If period_ms is None, the fetcher's delay_ms is used.
+    """
+    SLACK = 0.005 # Land just past the boundary, never just before it
+
+    def __init__(self, period_ms=None) -> None:
+        self.period_ms = period_ms
+
+    def next_due(self, fetcher, started, now):
+        period = (self.period_ms or fetcher.delay) / 1000.0
+        return now + period - time.time() % period + Aligned.SLACK
@@ -0,0 +1,300 @@
+import asyncio
+import heapq
+import itertools
+import sys
+import time
+import traceback
+from threading import Lock, Thread
+from .datastore import DataStore
+from .instrumentation import Stats
+
+
+class DataScheduler:
+    """
+    Process wide runner for every window's DataFetchers.
+
+    One long lived asyncio loop on one daemon thread. Fetchers sit in a heap
+    ordered by their next due time and a single loop timer is armed for the
+    head of the heap, so the thread sleeps until there is work to do.
+    All heap access happens on the loop thread.
+
+    Fetchers with a share_key are run once for every window subscribed to
+    that key, see SharedSource. A shared source stops with its last window.
+    """
+    loop = None # type: asyncio.AbstractEventLoop
+    thread = None # type: Thread
+    _start_lock = Lock()
+    _queue = [] # heap of (due, seq, window, fetcher)
+    _counter = itertools.count()
+    _timer = None # type: asyncio.TimerHandle
+    _windows = set() # Registered windows and active shared sources
+    _streams = {} # window -> tasks of its streaming fetchers
+    _sources = {} # share key -> SharedSource
+    _paused = {} # window -> fetchers waiting for it to become visible
+
+    def start():
+        """
+        Start the scheduler thread if it is not already running
+        """
+        with DataScheduler._start_lock:
+            if DataScheduler.is_alive():
+                return
+            loop = asyncio.new_event_loop()
+            DataScheduler.loop = loop
+            DataScheduler.thread = Thread(
+                target=DataScheduler._run,
+                args=(loop,),
+                name="uxceptional-data",
+                daemon=True
+            )
+            DataScheduler.thread.start()
+
+    def is_alive():
+        thread = DataScheduler.thread
+        return thread is not None and thread.is_alive()
+
+    def _run(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def run(coroutine):
+        """
+        Run a coroutine on the scheduler loop and wait for its result.
+        Must not be called from the scheduler thread.
+        """
+        DataScheduler.start()
+        future = asyncio.run_coroutine_threadsafe(coroutine, DataScheduler.loop)
+        return future.result()
+
+    def register(window, delayed=False):
+        """
+        Schedule every fetcher of a window.
+
+        Args:
+            window (WindowBase): Window whose fetchers to run
+            delayed (bool): If true, first run is one period from now
+                instead of immediately
+        """
+        DataScheduler.start()
+        DataScheduler.loop.call_soon_threadsafe(
+            DataScheduler._register, window, delayed
+        )
+
+    def unregister(window):
+        """
+        Stop running a window's fetchers
+        """
+        if DataScheduler.loop is None:
+            return
+        DataScheduler.loop.call_soon_threadsafe(
+            DataScheduler._unregister, window
+        )
+
+    def prime(window, fetchers):
+        """
+        Make sure the shared sources of fetchers have a value and hand it
+        to window, running each source at most once.
+        Must not be called from the scheduler thread.
+        """
+        return DataScheduler.run(DataScheduler._prime(window, fetchers))
+
+    async def _prime(window, fetchers):
+        sources = [DataScheduler._source(fetcher) for fetcher in fetchers]
+        pending = {
+            source for source in sources
+            if source.fetcher.key not in source.data and not source.fetcher.streaming
+        }
+        await asyncio.gather(
+            *(source.update_data(source.data, source.fetchers) for source in pending)
+        )
+        for source, fetcher in zip(sources, fetchers):
+            if source.fetcher.key in source.data:
+                window.publish(fetcher.key, source.data[source.fetcher.key])
+
+    def _source(fetcher):
+        source = DataScheduler._sources.get(fetcher.share_key)
+        if source is None:
+            source = DataScheduler._sources[fetcher.share_key] = SharedSource(fetcher)
+        return source
+
+    def _register(window, delayed):
+        DataScheduler._windows.add(window)
+        now = DataScheduler.loop.time()
+        for fetcher in window.fetchers:
+            if fetcher.share_key is not None:
+                DataScheduler._subscribe(window, fetcher, delayed)
+                continue
+            if fetcher.streaming:
+                task = DataScheduler.loop.create_task(
+                    DataScheduler._stream(window, fetcher)
+                )
+                DataScheduler._streams.setdefault(window, []).append(task)
+                continue
+            due = now + fetcher.delay / 1000.0 if delayed else now
+            DataScheduler._push(due, window, fetcher)
+
+    def _subscribe(window, fetcher, delayed):
+        source = DataScheduler._source(fetcher)
+        source.subscribers[window] = fetcher
+        fetcher.stats = source.stats
+        if source in DataScheduler._windows:
+            if source.fetcher.key in source.data:
+                window.publish(fetcher.key, source.data[source.fetcher.key])
+            return
+
+        # First subscriber, start the source
+        DataScheduler._windows.add(source)
+        if source.fetcher.streaming:
+            task = DataScheduler.loop.create_task(
+                DataScheduler._stream(source, source.fetcher)
+            )
+            DataScheduler._streams[source] = [task]
+            return
+        due = DataScheduler.loop.time()
+        if delayed and source.fetcher.key in source.data:
+            due += source.fetcher.delay / 1000.0
+        DataScheduler._push(due, source, source.fetcher)
+
+    def resume(window):
+        """
+        Run the fetchers paused while window was hidden
+        """
+        if DataScheduler.loop is None:
+            return
+        DataScheduler.loop.call_soon_threadsafe(DataScheduler._resume, window)
+
+    def _resume(window):
+        now = DataScheduler.loop.time()
+        for fetcher in DataScheduler._paused.pop(window, []):
+            DataScheduler._push(now, window, fetcher)
+        for source in DataScheduler._sources.values():
+            if window in source.subscribers:
+                DataScheduler._resume(source)
+
+    def _unregister(window):
+        DataScheduler._paused.pop(window, None)
+        for share_key, source in list(DataScheduler._sources.items()):
+            if source.subscribers.pop(window, None) is not None and not source.subscribers:
+                del DataScheduler._sources[share_key]
+                DataScheduler._unregister(source)
+        DataScheduler._windows.discard(window)
+        for task in DataScheduler._streams.pop(window, []):
+            task.cancel()
+        queue = [item for item in DataScheduler._queue if item[2] is not window]
+        heapq.heapify(queue)
+        DataScheduler._queue = queue
+
+    def _push(due, window, fetcher):
+        heapq.heappush(
+            DataScheduler._queue,
+            (due, next(DataScheduler._counter), window, fetcher)
+        )
+        DataScheduler._arm()
+
+    def _arm():
+        """
+        Make sure the loop timer fires for the head of the heap
+        """
+        if not DataScheduler._queue:
+            return
+        due = DataScheduler._queue[0][0]
+        timer = DataScheduler._timer
+        if timer is not None:
+            if timer.when() <= due:
+                return
+            timer.cancel()
+        DataScheduler._timer = DataScheduler.loop.call_at(due, DataScheduler._fire)
+
+    def _fire():
+        """
+        Pop every due fetcher and run them, one task per window
+        """
+        DataScheduler._timer = None
+        loop = DataScheduler.loop
+        queue = DataScheduler._queue
+        now = loop.time()
+        due = {}
+        while queue and queue[0][0] <= now:
+            fetcher_due, _, window, fetcher = heapq.heappop(queue)
+            due.setdefault(window, []).append(fetcher)
+            if Stats.enabled:
+                fetcher.stats.lateness.add((now - fetcher_due) * 1000.0)
+
+        for window, fetchers in due.items():
+            loop.create_task(DataScheduler._update(window, fetchers, now))
+        DataScheduler._arm()
+
+    async def _stream(window, fetcher):
+        try:
+            await fetcher.serve(window)
+        except Exception:
+            traceback.print_exc()
+
+    async def _update(window, fetchers, started):
+        try:
+            await window.update_data(window.data, fetchers)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            if window in DataScheduler._windows:
+                now = DataScheduler.loop.time()
+                for fetcher in fetchers:
+                    if fetcher.pause_hidden and not window.visible:
+                        DataScheduler._paused.setdefault(window, []).append(fetcher)
+                        continue
+                    DataScheduler._push(
+                        fetcher.policy.next_due(fetcher, started, now), window, fetcher
+                    )
+
+
+class SharedSource:
+    """
+    A fetcher shared by every window subscribed to its share_key.
+    Runs like a window of its own and fans results out to the
+    subscribers, stored under each subscriber's fetcher key.
+    """
+    def __init__(self, fetcher) -> None:
+        self.fetcher = fetcher # The first subscriber's, runs for all of them
+        self.fetchers = [fetcher]
+        self.stats = fetcher.stats # Runs of the source, reported by every subscriber
+        self.data = DataStore()
+        self.subscribers = {} # window -> its fetcher with this share_key
+
+    @property
+    def visible(self):
+        return any(window.visible for window in self.subscribers)
+
+    async def update_data(self, data, fetchers):
+        try:
+            await run_fetcher(self, data, self.fetcher)
+        except Exception:
+            traceback.print_exc()
+
+    def publish(self, key, value, data=None):
+        if not self.data.publish(key, value):
+            return False
+        for window, fetcher in list(self.subscribers.items()):
+            window.publish(fetcher.key, value)
+        return True
+
+
+async def run_fetcher(owner, data, fet):
+    """
+    Run a single fetcher with its timeout and owner.publish the result
+    """
+    started = time.perf_counter()
+    fet.changed = False
+    try:
+        result = await asyncio.wait_for(fet.function(data), fet.timeout / 1000.0)
+    except asyncio.TimeoutError:
+        fet.stats.timeouts += 1
+        print(f"DataFetcher {fet.key} timed out after {fet.timeout}ms", file=sys.stderr)
+        return
+    except Exception:
+        fet.stats.errors += 1
+        raise
+    if Stats.enabled:
+        fet.stats.add_run((time.perf_counter() - started) * 1000.0, fet.delay)
+
+    fet.value = result
+    fet.changed = owner.publish(fet.key, result, data)
@@ -1,3 +1,4 @@
+import math
 import imgui
 from enum import Enum, Flag, auto
 
@@ -17,6 +18,117 @@ class MonitorPreference(Enum):
     Active = auto()
 
 
+class Monitor:
+    """
+    A connected monitor as of the last layout query
+    """
+    def __init__(self, handle, name, pos, workarea, primary=False) -> None:
+        self.handle = handle
+        self.name = name
+        self.pos = pos # (x, y) in virtual screen coordinates
+        self.workarea = workarea # (x, y, width, height) without panels
+        self.primary = primary
+
+    def contains(self, x, y):
+        wx, wy, width, height = self.workarea
+        return wx <= x < wx + width and wy <= y < wy + height
+
+    def __repr__(self):
+        return f"Monitor({self.name!r}, workarea={self.workarea}, primary={self.primary})"
+
+
+class Monitors:
+    """
+    Cached monitor layout. Every glfw monitor query is an X round trip, so
+    the layout is only queried again after glfw reports a monitor change,
+    which bumps generation. Windows compare it to the generation they were
+    placed at, see ShellWindow.needs_monitor_update
+    """
+    generation = 1
+    _layout = None # [Monitor], None until queried
+    _watching = False
+
+    def watch(on_change=None):
+        """
+        Invalidate the layout whenever a monitor is connected or removed.
+        Must be called on the main thread after glfw.init.
+        on_change() runs after every invalidation
+        """
+        if Monitors._watching:
+            return
+        import glfw # Only loaded once a backend runs
+        def monitor_callback(monitor, event):
+            Monitors.invalidate()
+            if on_change is not None:
+                on_change()
+        glfw.set_monitor_callback(monitor_callback)
+        Monitors._watching = True
+
+    def invalidate():
+        Monitors._layout = None
+        Monitors.generation += 1
+
+    def set_layout(monitors):
+        """
+        Use a fixed layout, e.g. for the headless backend
+
+        Args:
+            monitors (list[Monitor]): Monitors, one of them primary
+        """
+        Monitors._layout = list(monitors)
+        Monitors.generation += 1
+
+    def is_cached():
+        """
+        True if the layout is known without a glfw query
+        """
+        return Monitors._layout is not None
+
+    def layout():
+        """
+        Returns:
+            list[Monitor]: Connected monitors, queried once per change
+        """
+        if Monitors._layout is None:
+            Monitors._layout = Monitors._query()
+        return Monitors._layout
+
+    def _query():
+        import glfw
+        primary = glfw.get_primary_monitor()
+        return [
+            Monitor(
+                handle,
+                glfw.get_monitor_name(handle),
+                glfw.get_monitor_pos(handle),
+                tuple(glfw.get_monitor_workarea(handle)),
+                primary=handle == primary,
+            )
+            for handle in glfw.get_monitors()
+        ]
+
+    def primary():
+        """
+        Returns:
+            Monitor: Primary monitor, None if there is no monitor
+        """
+        layout = Monitors.layout()
+        for monitor in layout:
+            if monitor.primary:
+                return monitor
+        return layout[0] if layout else None
+
+    def at(x, y):
+        """
+        Returns:
+            Monitor: Monitor whose work area contains the point, None if none does
+        """
+        for monitor in Monitors.layout():
+            if monitor.contains(x, y):
+                return monitor
+        return None
+
+
 class ShellWindow:
     """
     Represents the state and settings of an OS window managed by our application
@@ -31,7 +143,8 @@ class ShellWindow:
         monitor_preference=MonitorPreference.Unset,
         focus_on_show=False,
         user_resizable=False,
-        is_statusbar=False
+        is_statusbar=False,
+        target_fps=None
 
     ):
         if not min_size:
@@ -44,6 +157,7 @@ class ShellWindow:
 
         self.max_size = max_size
         self.size = min_size
+        self.window_size = list(min_size) # size with padding, see apply_bounds
         self.padding = [0, 0]
         self.data = {}
         self.pos = [-1, -1]
@@ -53,20 +167,73 @@ class ShellWindow:
         self.focus_on_show = focus_on_show
         self.user_resizable = user_resizable
         self.is_statusbar = is_statusbar
+        self.target_fps = target_fps # None draws at Backend.frame_rate
+        self.next_frame = 0.0 # glfw time the next frame is due
         self.renderer = None  # GlfwRenderer
         self.window_id = None
         self.context = None
+        # Work area the window is docked in, kept up to date by the backend
+        # through apply_monitor_preference
+        self.monitor = None # type: Monitor
+        self.workarea = None # (x, y, width, height)
+        self.monitor_generation = 0 # Monitors.generation of self.monitor
+        # Layout cache: the content size is measured by width_candidate and
+        # height_candidate once per layout key (data generation, theme,
+        # monitors), other frames reuse it and the candidates only move the cursor.
+        # A measured size grows to the next multiple of resize_step and
+        # only shrinks by at least shrink_hysteresis px, so flickering
+        # text widths don't resize the window every time
+        self.resize_step = 4
+        self.shrink_hysteresis = 24
+        self.layout_key = None # Key of layout_size, None measures every frame
+        self.layout_size = None # Settled size measured for layout_key
+        self.measuring = True # If the current frame measures its content
 
-    def init(self):
+    def init(self, layout_key=None):
         """
         Initialize window for drawing
-        Reset size calculations
+        Reset size calculations, unless the layout measured for layout_key
+        can be reused, see end_layout
         """
         self.style = imgui.get_style()
-        self.size = self.min_size
+        self.measuring = layout_key is None or layout_key != self.layout_key or self.layout_size is None
+        if self.measuring:
+            self.layout_key = layout_key
+            self.size = list(self.min_size)
+        else:
+            self.size = list(self.layout_size)
         self.pos = [-1, -1] # anything but -1 is a request
         self.padding = [int(self.style.window_padding.x), int(self.style.window_padding.y)]
 
+    def end_layout(self):
+        """
+        Settle the size measured this frame against the previous layout,
+        called by the backend after the window was built
+        """
+        if not self.measuring:
+            return
+        self.measuring = False
+        previous = self.layout_size or (0, 0)
+        self.size = [self.settle(self.size[axis], previous[axis]) for axis in (0, 1)]
+        self.apply_bounds()
+        self.layout_size = list(self.size)
+
+    def settle(self, measured, current):
+        """
+        Size along one axis for measured content, given the current size
+        """
+        step = self.resize_step
+        target = int(math.ceil(measured / step) * step)
+        if target > current or current - target >= self.shrink_hysteresis:
+            return target
+        return current
+
+    def invalidate_layout(self):
+        """
+        Measure again on the next frame, e.g. after fonts changed
+        """
+        self.layout_key = None
+
     def apply_bounds(self):
         """
         Apply min_size and max_size to size
@@ -82,24 +249,91 @@ class ShellWindow:
 
     def width_candidate(self):
         """
-        Log current cursor position as a candidate for the width of the window
+        Log current cursor position as a candidate for the width of the window.
+        The cursor moves the same way whether or not the frame measures
         """
         imgui.same_line()
-        width = self.size[0]
-        current = imgui.get_cursor_pos_x()
-        if current > width:
-            self.size[0] = current
-
+        if self.measuring:
+            width = self.size[0]
+            current = imgui.get_cursor_pos_x()
+            if current > width:
+                self.size[0] = current
         imgui.new_line()
-        self.apply_bounds()
+        if self.measuring:
+            self.apply_bounds()
 
     def height_candidate(self):
         """
         Log current cursor position as a candidate for the height of the window
         """
+        if not self.measuring:
+            return
         height = self.size[1]
         current = imgui.get_cursor_pos_y()
         if current > height:
             self.size[1] = current
 
         self.apply_bounds()
+
+    def needs_monitor_update(self, window_pos=None):
+        """
+        True if the monitor layout changed since the window was placed,
+        or an Active window was moved off its monitor.
+        Only compares cached state, no X round trips
+        """
+        if self.monitor_generation != Monitors.generation:
+            return True
+        if self.monitor_preference != MonitorPreference.Active or window_pos is None:
+            return False
+        return self.monitor is None or not self.monitor.contains(*window_pos)
+
+    def apply_monitor_preference(self, window_pos=None):
+        """
+        Pick the monitor the window is placed on: the primary one, or with
+        MonitorPreference.Active the one the window is on at window_pos
+        """
+        self.monitor_generation = Monitors.generation
+        monitor = None
+        if self.monitor_preference == MonitorPreference.Active and window_pos is not None:
+            monitor = Monitors.at(*window_pos)
+        self.monitor = monitor or Monitors.primary()
+        self.workarea = self.monitor.workarea if self.monitor else None
+
+    def dock_pos(self):
+        """
+        Position given by dock in the work area for the current size,
+        the size the backend gives the OS window
+
+        Returns:
+            list[int]: [x, y], -1 for an axis the dock leaves alone,
+                None if not docked or there is no work area
+        """
+        if self.dock == Direction.Nothing or self.workarea is None:
+            return None
+        x, y, width, height = self.workarea
+        window_width, window_height = self.size
+        pos = [-1, -1]
+        if Direction.Left in self.dock:
+            pos[0] = x
+        elif Direction.Right in self.dock:
+            pos[0] = x + width - window_width
+        elif Direction.Center in self.dock:
+            pos[0] = x + (width - window_width) // 2
+        if Direction.Top in self.dock:
+            pos[1] = y
+        elif Direction.Bottom in self.dock:
+            pos[1] = y + height - window_height
+        elif Direction.Center in self.dock:
+            pos[1] = y + (height - window_height) // 2
+        return [int(pos[0]), int(pos[1])]
+
+    def apply_dock(self):
+        """
+        Request the docked position unless the window requested one itself
+        this frame
+        """
+        if tuple(self.pos) != (-1, -1):
+            return
+        pos = self.dock_pos()
+        if pos is not None:
+            self.pos = pos
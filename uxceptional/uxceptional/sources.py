@@ -0,0 +1,316 @@
+"""
+Built in data sources that read the kernel's /proc and /sys files directly
+instead of forking a process per poll.
+
+Every factory returns a DataFetcher, e.g.
+    window.attach_data(sources.cpu_load("cpu"))
+
+File descriptors are kept open and re-read from the start with os.pread,
+rates are computed from the previous poll. Fetchers created with the same
+arguments share a share_key, so several bars showing the same source
+read it only once per period.
+"""
+import os
+import time
+from pathlib import Path
+from uxceptional.fetchers import DataFetcher, WatchFetcher
+from uxceptional.watch import Rtnetlink, Uevents
+from uxceptional.polling import Aligned
+
+
+class ProcFile:
+    """
+    A /proc or /sys file kept open and re-read with os.pread.
+    If the file goes away (e.g. a battery is removed) read() returns None
+    and the file is reopened on the next read.
+    """
+    CHUNK = 65536
+
+    def __init__(self, path) -> None:
+        self.path = str(path)
+        self.fd = None
+
+    def read(self):
+        """
+        Returns:
+            str: Current file contents or None if it can't be read
+        """
+        try:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+            chunks = []
+            offset = 0
+            while True:
+                chunk = os.pread(self.fd, ProcFile.CHUNK, offset)
+                chunks.append(chunk)
+                if len(chunk) < ProcFile.CHUNK:
+                    break
+                offset += len(chunk)
+        except OSError:
+            self.close()
+            return None
+        return b"".join(chunks).decode("utf-8", errors="surrogateescape")
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __del__(self):
+        self.close()
+
+
+def parse_proc_stat(text):
+    """
+    Parse the aggregate cpu line of /proc/stat
+
+    Returns:
+        tuple[int, int]: idle and total jiffies
+    """
+    for line in text.splitlines():
+        if line.startswith("cpu "):
+            fields = [int(field) for field in line.split()[1:]]
+            # idle + iowait count as idle, guest time is already in user
+            idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+            total = sum(fields[:8])
+            return idle, total
+    raise ValueError("No aggregate cpu line in /proc/stat")
+
+
+def parse_meminfo(text):
+    """
+    Parse /proc/meminfo
+
+    Returns:
+        dict[str, int]: Field name to value in kB
+    """
+    values = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            values[name] = int(fields[0])
+    return values
+
+
+def parse_net_dev(text):
+    """
+    Parse /proc/net/dev
+
+    Returns:
+        dict[str, tuple[int, int]]: Interface to received and transmitted bytes
+    """
+    interfaces = {}
+    for line in text.splitlines()[2:]: # two header lines
+        name, _, counters = line.partition(":")
+        fields = counters.split()
+        if len(fields) < 9:
+            continue
+        interfaces[name.strip()] = (int(fields[0]), int(fields[8]))
+    return interfaces
+
+
+class Clock:
+    def __init__(self, time_format) -> None:
+        self.time_format = time_format
+
+    async def __call__(self, data):
+        return time.strftime(self.time_format)
+
+
+class CpuLoad:
+    def __init__(self, path) -> None:
+        self.file = ProcFile(path)
+        self.last = None
+
+    async def __call__(self, data):
+        text = self.file.read()
+        if text is None:
+            return None
+        idle, total = parse_proc_stat(text)
+        last, self.last = self.last, (idle, total)
+        if last is None or total == last[1]:
+            return 0.0
+        busy = (total - last[1]) - (idle - last[0])
+        return round(100.0 * busy / (total - last[1]), 1)
+
+
+class Memory:
+    def __init__(self, path) -> None:
+        self.file = ProcFile(path)
+
+    async def __call__(self, data):
+        text = self.file.read()
+        if text is None:
+            return None
+        info = parse_meminfo(text)
+        total = info["MemTotal"]
+        available = info.get("MemAvailable", info.get("MemFree", 0))
+        return {
+            "total": total,
+            "available": available,
+            "used": total - available,
+            "percent": round(100.0 * (total - available) / total, 1) if total else 0.0,
+        }
+
+
+class Battery:
+    def __init__(self, path) -> None:
+        self.capacity = ProcFile(Path(path) / "capacity")
+        self.status = ProcFile(Path(path) / "status")
+
+    async def __call__(self, data):
+        capacity = self.capacity.read()
+        status = self.status.read()
+        if capacity is None or status is None:
+            return None
+        return {
+            "capacity": int(capacity),
+            "status": status.strip(), # Charging, Discharging, Full, ...
+        }
+
+
+class Backlight:
+    def __init__(self, path) -> None:
+        self.brightness = ProcFile(Path(path) / "brightness")
+        self.max_brightness = ProcFile(Path(path) / "max_brightness")
+
+    async def __call__(self, data):
+        brightness = self.brightness.read()
+        max_brightness = self.max_brightness.read()
+        if brightness is None or max_brightness is None or not int(max_brightness):
+            return None
+        return round(100.0 * int(brightness) / int(max_brightness))
+
+
+class LinkState:
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+
+    async def __call__(self, data):
+        states = {}
+        try:
+            interfaces = sorted(os.listdir(self.path))
+        except OSError:
+            return None
+        for name in interfaces:
+            if name == "lo":
+                continue
+            operstate = ProcFile(self.path / name / "operstate").read()
+            if operstate is not None:
+                states[name] = operstate.strip() # up, down, dormant, ...
+        return states
+
+
+class Network:
+    def __init__(self, path, interface) -> None:
+        self.file = ProcFile(path)
+        self.interface = interface
+        self.last = None
+
+    async def __call__(self, data):
+        text = self.file.read()
+        if text is None:
+            return None
+        interfaces = parse_net_dev(text)
+        if self.interface is None:
+            counters = [value for name, value in interfaces.items() if name != "lo"]
+        else:
+            counters = [interfaces[self.interface]] if self.interface in interfaces else []
+        rx = sum(counter[0] for counter in counters)
+        tx = sum(counter[1] for counter in counters)
+
+        now = time.monotonic()
+        last, self.last = self.last, (now, rx, tx)
+        if last is None or now == last[0]:
+            return {"rx": 0.0, "tx": 0.0}
+        elapsed = now - last[0]
+        # Counters reset when an interface goes down, never report negative rates
+        return {
+            "rx": max(rx - last[1], 0) / elapsed, # bytes per second
+            "tx": max(tx - last[2], 0) / elapsed,
+        }
+
+
+def clock(key="time", time_format="%a %b %e %H:%M:%S %Z %Y", delay_ms=1000):
+    """
+    Local time formatted with time.strftime, updated right after every
+    wall clock multiple of delay_ms (e.g. 60000 for a clock without seconds)
+    """
+    return DataFetcher(
+        key, Clock(time_format), delay_ms,
+        share_key=("clock", time_format, delay_ms), policy=Aligned()
+    )
+
+
+def cpu_load(key="cpu", delay_ms=1000, path="/proc/stat"):
+    """
+    Percentage of cpu time spent busy since the previous poll
+    """
+    return DataFetcher(key, CpuLoad(path), delay_ms, share_key=("cpu_load", path, delay_ms))
+
+
+def memory(key="memory", delay_ms=2000, path="/proc/meminfo"):
+    """
+    dict of total, available and used memory in kB and percent used
+    """
+    return DataFetcher(key, Memory(path), delay_ms, share_key=("memory", path, delay_ms))
+
+
+def battery(key="battery", name="BAT0", delay_ms=5000, path="/sys/class/power_supply"):
+    """
+    dict of capacity percentage and charging status,
+    None if the battery does not exist
+    """
+    path = Path(path) / name
+    return DataFetcher(key, Battery(path), delay_ms, share_key=("battery", str(path), delay_ms))
+
+
+def network(key="network", interface=None, delay_ms=1000, path="/proc/net/dev"):
+    """
+    dict of received and transmitted bytes per second on interface,
+    or summed over every interface but lo if interface is None
+    """
+    return DataFetcher(
+        key, Network(path, interface), delay_ms,
+        share_key=("network", path, interface, delay_ms)
+    )
+
+
+def battery_events(key="battery", name="BAT0", fallback_ms=60000, path="/sys/class/power_supply"):
+    """
+    Like battery, but read when the kernel reports a power supply event
+    (plugged in, unplugged, ...). Capacity changes are not always reported,
+    so it is read every fallback_ms without events too.
+    """
+    path = Path(path) / name
+    return WatchFetcher(
+        key, Battery(path), lambda: Uevents("power_supply"), fallback_ms,
+        share_key=("battery_events", str(path), fallback_ms)
+    )
+
+
+def backlight(key="backlight", name=None, path="/sys/class/backlight"):
+    """
+    Brightness percentage of a backlight (the first one if name is None),
+    read when the kernel reports a brightness change.
+    None if there is no backlight
+    """
+    if name is None:
+        try:
+            name = min(os.listdir(path))
+        except (OSError, ValueError):
+            name = ""
+    path = Path(path) / name
+    return WatchFetcher(
+        key, Backlight(path), lambda: Uevents("backlight"),
+        share_key=("backlight", str(path))
+    )
+
+
+def link_state(key="links", path="/sys/class/net"):
+    """
+    dict of interface name -> operstate for every interface but lo,
+    read when rtnetlink reports a link or address change
+    """
+    return WatchFetcher(key, LinkState(path), Rtnetlink, share_key=("link_state", path))
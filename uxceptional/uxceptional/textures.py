@@ -0,0 +1,381 @@
+import ctypes
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import glfw
+import OpenGL.GL as gl
+from PIL import Image
+from .icontheme import lookup_icon
+from .instrumentation import Stats
+
+
+class Texture:
+    """
+    Handle to an OpenGL texture, or to a region of a shared icon atlas.
+    Draw with texture_id and the uv0 / uv1 rectangle.
+    """
+    def __init__(self, key, texture_id, width, height, uv0=(0.0, 0.0), uv1=(1.0, 1.0)) -> None:
+        self.key = key
+        self.texture_id = texture_id
+        self.width = width
+        self.height = height
+        self.uv0 = uv0
+        self.uv1 = uv1
+        self.atlas = None # type: Atlas
+        self.refs = 0
+        self.ready = True # False while a background load is pending
+
+
+class Atlas:
+    """
+    One texture that small icons are packed into, row by row.
+    Released regions are kept per size and reused for icons of that size.
+    """
+    PADDING = 1 # keep linear filtering from bleeding between icons
+
+    def __init__(self, size) -> None:
+        self.size = size
+        self.rows = [] # [y, height, next free x]
+        self.next_y = 0
+        self.free = {} # (width, height) -> [(x, y)]
+        self.texture_id = gl.glGenTextures(1)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture_id)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
+        gl.glTexImage2D(
+            gl.GL_TEXTURE_2D, 0, gl.GL_RGBA, size, size, 0,
+            gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, bytes(size * size * 4)
+        )
+        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+
+    def allocate(self, width, height):
+        """
+        Returns:
+            tuple[int, int]: Top left corner of a free region, None if full
+        """
+        reusable = self.free.get((width, height))
+        if reusable:
+            return reusable.pop()
+
+        padded_w = width + Atlas.PADDING
+        padded_h = height + Atlas.PADDING
+        for row in self.rows:
+            y, row_height, x = row
+            if padded_h <= row_height and x + padded_w <= self.size:
+                row[2] += padded_w
+                return x, y
+
+        if self.next_y + padded_h > self.size or padded_w > self.size:
+            return None
+        self.rows.append([self.next_y, padded_h, padded_w])
+        self.next_y += padded_h
+        return 0, self.rows[-1][0]
+
+    def release(self, x, y, width, height):
+        self.free.setdefault((width, height), []).append((x, y))
+
+    def upload(self, x, y, width, height, pixels):
+        gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture_id)
+        gl.glTexSubImage2D(
+            gl.GL_TEXTURE_2D, 0, x, y, width, height,
+            gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, pixels
+        )
+        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+        Stats.count_texture_upload(width * height * 4)
+
+
+class TextureManager:
+    """
+    Process wide texture cache.
+
+    Decoded pixels are kept in a bounded LRU keyed by (path, size).
+    GL textures are keyed by icon name, size and theme (or by path) and
+    reference counted; TextureManager.release frees them once unused.
+    Icons up to atlas_max_icon pixels are packed into shared atlas textures.
+    GL objects live per share group of GL contexts, so the current context
+    decides which group a texture lands in.
+
+    The *_async variants decode on a worker pool and hand back a placeholder
+    right away. Only the upload happens on the main thread, batched by
+    process_uploads within a time budget.
+    """
+    atlas_size = 1024
+    atlas_max_icon = 64
+    cache_size = 64
+    decode_workers = 2
+    wake = None # Called from workers when an upload is queued
+    shared_group = None # Set when every GL context shares one group
+    _decoded = OrderedDict() # (path, size) -> (width, height, pixels)
+    _decoded_lock = Lock()
+    _textures = {} # (share group, key) -> Texture
+    _atlases = {} # share group -> [Atlas]
+    _placeholders = {} # share group -> 1x1 transparent texture ID
+    _pool = None # type: ThreadPoolExecutor
+    _uploads = deque() # (share group, texture, decoded)
+
+    def share_group():
+        """
+        Identify the GL objects visible to the current context
+        """
+        if TextureManager.shared_group is not None:
+            return TextureManager.shared_group
+        return ctypes.cast(glfw.get_current_context(), ctypes.c_void_p).value
+
+    def decode(path, size=None):
+        """
+        Decode an image to RGBA bytes, optionally resized to size x size
+
+        Returns:
+            tuple[int, int, bytes]: width, height and pixels
+        """
+        key = (str(path), size)
+        cache = TextureManager._decoded
+        with TextureManager._decoded_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+
+        with Image.open(path) as im:
+            convert = im.convert("RGBA")
+            if size is not None and convert.size != (size, size):
+                convert = convert.resize((size, size), Image.LANCZOS)
+            decoded = (convert.width, convert.height, convert.tobytes())
+
+        with TextureManager._decoded_lock:
+            cache[key] = decoded
+            while len(cache) > TextureManager.cache_size:
+                cache.popitem(last=False)
+        return decoded
+
+    def forget(path=None):
+        """
+        Drop decoded pixels of path, or of every image if path is None
+        """
+        with TextureManager._decoded_lock:
+            if path is None:
+                TextureManager._decoded.clear()
+                return
+            for key in [key for key in TextureManager._decoded if key[0] == str(path)]:
+                del TextureManager._decoded[key]
+
+    def icon(icon_name, icon_size, theme=None) -> Texture:
+        """
+        Get a texture for an icon from the icon theme
+        """
+        key = ("icon", icon_name, icon_size, theme)
+        texture = TextureManager._lookup(key)
+        if texture:
+            return texture
+
+        width, height, pixels = TextureManager._decode_icon(icon_name, icon_size, theme)
+        return TextureManager._create(key, width, height, pixels)
+
+    def icon_async(icon_name, icon_size, theme=None) -> Texture:
+        """
+        Like icon, but decode in the background. The returned texture draws
+        nothing until process_uploads has uploaded it.
+        """
+        key = ("icon", icon_name, icon_size, theme)
+        return TextureManager._load_async(
+            key, TextureManager._decode_icon, icon_name, icon_size, theme
+        )
+
+    def texture_async(path) -> Texture:
+        """
+        Like texture, but decode in the background.
+        """
+        key = ("file", str(path))
+        return TextureManager._load_async(key, TextureManager.decode, path)
+
+    def pending_uploads():
+        """
+        Number of textures decoded in the background and not uploaded yet
+        """
+        return len(TextureManager._uploads)
+
+    def process_uploads(budget_ms=2.0):
+        """
+        Upload textures decoded in the background for the current share
+        group. Must run on the main thread. Stops once budget_ms is spent,
+        but always uploads at least one texture.
+
+        Returns:
+            int: Number of textures uploaded
+        """
+        uploads = TextureManager._uploads
+        if not uploads:
+            return 0
+        group = TextureManager.share_group()
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        skipped = []
+        done = 0
+        while uploads:
+            item = uploads.popleft()
+            item_group, texture, decoded = item
+            if item_group != group:
+                skipped.append(item)
+                continue
+            if texture.refs > 0: # Not released while it was decoding
+                TextureManager._fill(texture, group, *decoded)
+                done += 1
+            if time.perf_counter() > deadline:
+                break
+        uploads.extendleft(reversed(skipped))
+        return done
+
+    def _decode_icon(icon_name, icon_size, theme):
+        path = lookup_icon(icon_name, icon_size, theme)
+        if path is None:
+            raise FileNotFoundError(f"Unable to find icon {icon_name}")
+        return TextureManager.decode(path, icon_size)
+
+    def _load_async(key, decoder, *args) -> Texture:
+        texture = TextureManager._lookup(key)
+        if texture:
+            return texture
+
+        group = TextureManager.share_group()
+        if group not in TextureManager._placeholders:
+            TextureManager._placeholders[group] = upload_texture(1, 1, bytes(4))
+        texture = Texture(key, TextureManager._placeholders[group], 0, 0)
+        texture.ready = False
+        texture.refs = 1
+        TextureManager._textures[(group, key)] = texture
+
+        if TextureManager._pool is None:
+            TextureManager._pool = ThreadPoolExecutor(
+                max_workers=TextureManager.decode_workers,
+                thread_name_prefix="uxceptional-decode"
+            )
+        TextureManager._pool.submit(
+            TextureManager._decode_job, group, texture, decoder, args
+        )
+        return texture
+
+    def _decode_job(group, texture, decoder, args):
+        try:
+            decoded = decoder(*args)
+        except Exception as e:
+            print(f"Unable to load texture {texture.key}: {e}", file=sys.stderr)
+            # Drop the placeholder, the next lookup tries again
+            if TextureManager._textures.get((group, texture.key)) is texture:
+                TextureManager._textures.pop((group, texture.key), None)
+            return
+        TextureManager._uploads.append((group, texture, decoded))
+        if TextureManager.wake:
+            TextureManager.wake()
+
+    def texture(path, pack=True) -> Texture:
+        """
+        Get a texture for an image file.
+        Small images are packed into an atlas unless pack is false, which
+        gives them a texture of their own that draws with the default UVs.
+        """
+        key = ("file", str(path)) if pack else ("file", str(path), "standalone")
+        texture = TextureManager._lookup(key)
+        if texture:
+            return texture
+
+        width, height, pixels = TextureManager.decode(path)
+        return TextureManager._create(key, width, height, pixels, pack)
+
+    def release(texture: Texture):
+        """
+        Drop a reference to a texture, freeing it when nobody uses it.
+        Must be called with a context of the texture's share group current.
+        """
+        texture.refs -= 1
+        if texture.refs > 0:
+            return
+
+        group = TextureManager.share_group()
+        if TextureManager._textures.get((group, texture.key)) is texture: # Not a retry of a failed load
+            del TextureManager._textures[(group, texture.key)]
+        if not texture.ready:
+            return # Nothing uploaded yet, process_uploads will skip it
+        if texture.atlas is not None:
+            x = round(texture.uv0[0] * texture.atlas.size)
+            y = round(texture.uv0[1] * texture.atlas.size)
+            texture.atlas.release(x, y, texture.width, texture.height)
+        else:
+            gl.glDeleteTextures([texture.texture_id])
+
+    def _lookup(key):
+        texture = TextureManager._textures.get((TextureManager.share_group(), key))
+        if texture:
+            texture.refs += 1
+        return texture
+
+    def _create(key, width, height, pixels, pack=True) -> Texture:
+        group = TextureManager.share_group()
+        texture = Texture(key, None, width, height)
+        TextureManager._fill(texture, group, width, height, pixels, pack)
+        texture.refs = 1
+        TextureManager._textures[(group, key)] = texture
+        return texture
+
+    def _fill(texture: Texture, group, width, height, pixels, pack=True):
+        """
+        Upload pixels into the atlas or a texture of their own
+        and point texture at them
+        """
+        texture.width = width
+        texture.height = height
+        if (not pack or max(width, height) > TextureManager.atlas_max_icon
+                or not TextureManager._pack(texture, group, pixels)):
+            texture.texture_id = upload_texture(width, height, pixels)
+            texture.uv0, texture.uv1 = (0.0, 0.0), (1.0, 1.0)
+        texture.ready = True
+
+    def _pack(texture: Texture, group, pixels):
+        width, height = texture.width, texture.height
+        atlases = TextureManager._atlases.setdefault(group, [])
+        for atlas in atlases:
+            corner = atlas.allocate(width, height)
+            if corner:
+                break
+        else:
+            atlas = Atlas(TextureManager.atlas_size)
+            atlases.append(atlas)
+            corner = atlas.allocate(width, height)
+            if corner is None:
+                return False
+
+        x, y = corner
+        atlas.upload(x, y, width, height, pixels)
+        size = atlas.size
+        texture.texture_id = atlas.texture_id
+        texture.uv0 = (x / size, y / size)
+        texture.uv1 = ((x + width) / size, (y + height) / size)
+        texture.atlas = atlas
+        return True
+
+
+def upload_texture(width, height, pixels):
+    """
+    Upload RGBA pixels to a new texture
+
+    Returns:
+        int: OpenGL texture ID
+    """
+    tex = gl.glGenTextures(1)
+    gl.glBindTexture(gl.GL_TEXTURE_2D, tex)
+    gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+    gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
+    gl.glTexImage2D(
+        gl.GL_TEXTURE_2D,
+        0,
+        gl.GL_RGBA,
+        width,
+        height,
+        0,
+        gl.GL_RGBA,
+        gl.GL_UNSIGNED_BYTE,
+        pixels,
+    )
+
+    gl.glBindTexture(gl.GL_TEXTURE_2D, 0)  # cleanup
+    Stats.count_texture_upload(width * height * 4)
+    return tex
@@ -0,0 +1,164 @@
+"""
+Compiled imgui themes.
+
+A Theme is written with hex colors and imgui style names, e.g.
+
+    Theme(
+        colors={"window_background": "#282a36", "text": "#f8f8f2"},
+        style={"window_rounding": 0.0},
+        palette={"playing": "#50fa7b"},
+    )
+
+and compiled once into imgui color indices and float tuples. Style is part
+of the imgui context, so a window's theme is applied to its context only
+when it changes (see WindowBase.theme) instead of being pushed and popped
+every frame. The style the context had before is restored first, so
+nothing of a previous theme is left behind.
+"""
+from contextlib import contextmanager
+import imgui
+from .apputils import vec_color
+
+
+class Theme:
+    """
+    Args:
+        colors (dict): imgui style color name ("text" for imgui.COLOR_TEXT)
+            or index -> hex color
+        style (dict): imgui style attribute ("window_rounding") -> value
+        palette (dict): Application color name -> hex color, compiled to
+            Theme.vec and Theme.u32 for use in widgets
+    """
+    def __init__(self, colors=None, style=None, palette=None) -> None:
+        self.colors = dict(colors or {})
+        self.style = dict(style or {})
+        self.palette = dict(palette or {})
+        self.version = 0 # Bumped on every change, see WindowBase.apply_theme
+        self.compile()
+
+    def compile(self):
+        """
+        Resolve names and parse colors, raises ValueError for unknown names
+        """
+        self.compiled_colors = [
+            (color_index(name), vec_color(value)) for name, value in self.colors.items()
+        ]
+        self.compiled_style = [
+            (name, value, style_var(name)) for name, value in self.style.items()
+        ]
+        self.vec = {name: vec_color(value) for name, value in self.palette.items()}
+        self.u32 = {name: pack_u32(color) for name, color in self.vec.items()}
+        self.version += 1
+
+    def update(self, colors=None, style=None, palette=None):
+        """
+        Change entries of the theme, recompiling only if a value changed.
+        Windows using the theme pick the change up on their next frame.
+        """
+        changed = False
+        for current, new in ((self.colors, colors), (self.style, style), (self.palette, palette)):
+            for name, value in (new or {}).items():
+                if current.get(name) != value:
+                    current[name] = value
+                    changed = True
+        if changed:
+            self.compile()
+        return changed
+
+    def apply(self, style=None):
+        """
+        Write the whole theme into an imgui style, the current one if None
+        """
+        if style is None:
+            style = imgui.get_style()
+        colors = style.colors
+        for index, color in self.compiled_colors:
+            colors[index] = color
+        for name, value, _ in self.compiled_style:
+            setattr(style, name, value)
+
+    @contextmanager
+    def pushed(self):
+        """
+        Push the whole theme for part of a frame and pop it afterwards
+        """
+        for index, color in self.compiled_colors:
+            imgui.push_style_color(index, *color)
+        pushed_vars = 0
+        for _, value, var in self.compiled_style:
+            if var is None:
+                continue
+            if isinstance(value, (tuple, list)):
+                imgui.push_style_var(var, tuple(value))
+            else:
+                imgui.push_style_var(var, value)
+            pushed_vars += 1
+        try:
+            yield self
+        finally:
+            imgui.pop_style_var(pushed_vars)
+            imgui.pop_style_color(len(self.compiled_colors))
+
+
+# Every imgui style attribute but colors, see snapshot_style
+STYLE_ATTRIBUTES = [
+    name for name in dir(imgui.GuiStyle)
+    if not name.startswith("_") and name != "colors" and not callable(getattr(imgui.GuiStyle, name))
+]
+
+
+def snapshot_style(style=None):
+    """
+    Copy of the colors and attributes of an imgui style, the current one if None
+
+    Returns:
+        tuple[list, dict]: Colors by index and attributes, for restore_style
+    """
+    if style is None:
+        style = imgui.get_style()
+    colors = [tuple(style.colors[index]) for index in range(imgui.COLOR_COUNT)]
+    return colors, {name: getattr(style, name) for name in STYLE_ATTRIBUTES}
+
+
+def restore_style(snapshot, style=None):
+    """
+    Write a snapshot_style back into an imgui style, the current one if None
+    """
+    if style is None:
+        style = imgui.get_style()
+    colors, attributes = snapshot
+    for index, color in enumerate(colors):
+        style.colors[index] = color
+    for name, value in attributes.items():
+        setattr(style, name, value)
+
+
+def color_index(name):
+    """
+    imgui color index of a style color name
+    """
+    if isinstance(name, int):
+        return name
+    name = name.replace("_bg", "_background") # Dear ImGui spelling, e.g. window_bg
+    index = getattr(imgui, f"COLOR_{name.upper()}", None)
+    if index is None:
+        raise ValueError(f"Unknown imgui style color {name}")
+    return index
+
+
+def style_var(name):
+    """
+    imgui.push_style_var constant of a style attribute, None if imgui
+    can't push it
+    """
+    if not hasattr(imgui.GuiStyle, name):
+        raise ValueError(f"Unknown imgui style attribute {name}")
+    return getattr(imgui, "STYLE_" + name.upper().replace("BORDER_SIZE", "BORDERSIZE"), None)
+
+
+def pack_u32(color):
+    """
+    Pack a float color like imgui.get_color_u32_rgba, without needing a context
+    """
+    r, g, b, a = (int(channel * 255.0 + 0.5) for channel in color)
+    return (a << 24) | (b << 16) | (g << 8) | r
@@ -0,0 +1,139 @@
+"""
+File descriptors that become readable when desktop state changes,
+for use with WatchFetcher instead of polling, e.g.
+
+    WatchFetcher("battery", read_battery, lambda: Uevents("power_supply"))
+
+Every watch is non-blocking and has fileno(), read() returning the events
+received since the last read (an empty list if none matter) and close().
+"""
+import ctypes
+import os
+import socket
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+UEVENT_KERNEL_GROUP = 0x1
+
+
+class Inotify:
+    """
+    inotify watch of files or directories.
+    Note that most sysfs attributes never change their mtime, they only
+    notify if the driver calls sysfs_notify; prefer Uevents for devices.
+    """
+    DEFAULT_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, paths, mask=DEFAULT_MASK) -> None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        for path in paths:
+            if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+                errno = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(errno, os.strerror(errno), str(path))
+
+    def fileno(self):
+        return self.fd
+
+    def read(self):
+        """
+        Returns:
+            list[bytes]: Raw inotify event buffers
+        """
+        return drain(lambda: os.read(self.fd, 4096))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Netlink:
+    """
+    Netlink socket subscribed to multicast groups
+    """
+    def __init__(self, protocol, groups) -> None:
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC, protocol)
+        self.sock.setblocking(False)
+        self.sock.bind((0, groups))
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read(self):
+        """
+        Returns:
+            list[bytes]: Raw netlink messages
+        """
+        return drain(lambda: self.sock.recv(65536))
+
+    def close(self):
+        self.sock.close()
+
+
+class Rtnetlink(Netlink):
+    """
+    Link and address changes of network interfaces
+    """
+    def __init__(self, groups=RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR) -> None:
+        super().__init__(socket.NETLINK_ROUTE, groups)
+
+
+class Uevents(Netlink):
+    """
+    Kernel device events (what udev listens to), optionally only those
+    of some subsystems e.g. "power_supply" or "backlight"
+    """
+    def __init__(self, *subsystems) -> None:
+        super().__init__(socket.NETLINK_KOBJECT_UEVENT, UEVENT_KERNEL_GROUP)
+        self.subsystems = set(subsystems)
+
+    def read(self):
+        """
+        Returns:
+            list[dict]: Properties of each uevent, e.g. ACTION and SUBSYSTEM
+        """
+        events = [parse_uevent(message) for message in super().read()]
+        if self.subsystems:
+            events = [event for event in events if event.get("SUBSYSTEM") in self.subsystems]
+        return events
+
+
+def parse_uevent(message):
+    """
+    Properties of a kernel uevent, "change@/devices/...\\0KEY=value\\0..."
+    """
+    event = {}
+    for field in message.split(b"\0")[1:]:
+        key, sep, value = field.partition(b"=")
+        if sep:
+            event[key.decode(errors="replace")] = value.decode(errors="replace")
+    return event
+
+
+def drain(read):
+    """
+    Call read until the non-blocking fd has nothing left
+    """
+    chunks = []
+    while True:
+        try:
+            chunk = read()
+        except BlockingIOError:
+            break
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return chunks
@@ -1,66 +1,110 @@
-from datetime import datetime
-from time import sleep
-from typing import Any, Type
-from uxceptional.shellwindow import ShellWindow
+from uxceptional.shellwindow import Monitors, ShellWindow
+from uxceptional.scheduler import DataScheduler, run_fetcher
+from uxceptional.fetchers import DataFetcher, StreamFetcher, WatchFetcher
+from uxceptional.datastore import DataStore
+from uxceptional.datacache import DataCache
 from abc import abstractmethod
-from threading import Lock, Thread
 from contextlib import contextmanager
 import asyncio
+import atexit
+import traceback
 import imgui
+from uxceptional.instrumentation import FrameStats
+from uxceptional.theme import Theme, restore_style, snapshot_style
 
 class DataThreadFailedException(Exception):
     pass
 
-class DataFetcher:
-    def __init__(self, key, function : Type[lambda _: Any], delay_ms: int) -> None:
-        """
-        Create a datafetcher instance with a function e.g.
-        async def fn(data):
-            return {"calculated_data": 0}
-
-        where fn is called:
-            data[fetcher.key] = fn(data)
-
-        called every $delay_ms milliseconds
-        """
-        self.key = key
-        self.function = function
-        self.delay = delay_ms
-
 class WindowBase:
     """
     Basis for every shell window implementation
     """
     def __init__(self) -> None:
         self.state = ShellWindow() # default, should be created by implementation
-        self.thread_lock = Lock()
-        
-        # The window data store
-        self.data = {
-            "timestamps": {},
-            "refresh_period": 0.1 # Frequency of data update cycle. 
-        }
+        # The window data store, read without locking from the render thread
+        self.data = DataStore()
+        # Store generation seen by the previous and the current frame
+        self.last_generation = 0
+        self.frame_generation = 0
         self.fetchers = []
+        self.textures = {} # name -> Texture or texture ID, see imgui_icon
         self.window_flags = imgui.WINDOW_NO_SAVED_SETTINGS | imgui.WINDOW_NO_MOVE
         self.window_flags |= imgui.WINDOW_NO_RESIZE | imgui.WINDOW_NO_TITLE_BAR
         self.window_flags |= imgui.WINDOW_NO_SCROLLBAR
+        self.frame_stats = FrameStats() # Filled by the backend, see instrumentation
 
         self.initialized = False
-        self.data_thread = Thread(target=self._data_thread, daemon=True)
         self.raise_if_no_data_thread = False
         self.blocking = True # If no, do not wait for the init thread to finish
+        # Redraw on demand bookkeeping, see Backend.redraw_on_demand
+        self.redraw_frames = 1 # Frames still owed to this window
+        self.animating = False # If true, draw every frame regardless of damage
+        # Retained frames: while the frame key (data generation, input, size)
+        # is unchanged the last draw data is shown again instead of building
+        # a new frame. Disable for windows drawing anything not in self.data
+        self.retained = True
+        self.frame_key = None
+        self.frame_builds = 0 # Frames built in a row with frame_key
+        # Theme applied to this window's imgui context, may be swapped at
+        # any time. Applied once per change, see apply_theme
+        self.theme = None # type: Theme
+        self.applied_theme = None # theme_key of the applied theme
+        self.base_style = None # Context style before any theme, see apply_theme
+        self.visible = True # False while iconified, see set_visible
+        # Last known fetcher values persisted between runs, restored as
+        # stale data so the first frame needn't wait for fetchers
+        self.data_cache = None # type: DataCache
 
-    async def _init(self):
+    def _init(self):
         """
-        Fetch initial data and start data thread
+        Fetch initial data and register with the data scheduler
         """
-        if self.blocking: # Wait for the full loop to complete before loading
-        for datasource in self.fetchers:
-            self.data[datasource.key] = await datasource.function(self.data)
+        warm = self.load_data_cache()
+        blocking = self.blocking and not warm
+        if blocking: # Wait for the full loop to complete before loading
+            polled = [fet for fet in self.fetchers if not fet.streaming and fet.share_key is None]
+            DataScheduler.run(self.update_data(self.data, polled))
+            shared = [fet for fet in self.fetchers if fet.share_key is not None]
+            if shared:
+                DataScheduler.prime(self, shared)
 
-        self.data_thread.start()
+        DataScheduler.register(self, delayed=blocking)
         self.init_hook()
 
+    def load_data_cache(self):
+        """
+        Restore the fetcher values of the previous run from self.data_cache
+        as stale data
+
+        Returns:
+            bool: True if every fetcher has a restored value
+        """
+        if self.data_cache is None:
+            return False
+        atexit.register(self.save_data_cache)
+        keys = {fet.key for fet in self.fetchers}
+        values = {key: value for key, value in self.data_cache.load().items() if key in keys}
+        self.data.restore(values)
+        return bool(keys) and keys <= values.keys()
+
+    def close_data_cache(self):
+        """
+        Save self.data_cache a last time, called when the window closes
+        """
+        if self.data_cache is None:
+            return
+        atexit.unregister(self.save_data_cache)
+        self.save_data_cache()
+
+    def save_data_cache(self):
+        """
+        Write the current fetcher values to self.data_cache
+        """
+        if self.data_cache is None:
+            return
+        data = self.data.snapshot()
+        self.data_cache.save({fet.key: data[fet.key] for fet in self.fetchers if fet.key in data})
+
     @abstractmethod
     def init_hook(self):
         """
@@ -97,25 +141,64 @@ class WindowBase:
         if texture_name not in self.textures:
             raise ValueError(f"Unable to find {texture_name} in texture atlas")
 
+        texture = self.textures[texture_name]
         cursor = imgui.get_cursor_pos()
-        imgui.get_window_draw_list().add_image(
-            self.textures[texture_name],
-            (cursor.x, cursor.y),
-            (cursor.x + size, cursor.y + size),
-        )
+        if isinstance(texture, int):
+            imgui.get_window_draw_list().add_image(
+                texture,
+                (cursor.x, cursor.y),
+                (cursor.x + size, cursor.y + size),
+            )
+        else: # A Texture, possibly a region of an atlas
+            imgui.get_window_draw_list().add_image(
+                texture.texture_id,
+                (cursor.x, cursor.y),
+                (cursor.x + size, cursor.y + size),
+                texture.uv0,
+                texture.uv1,
+            )
         cursor = (cursor.x + size, cursor.y)
         imgui.set_cursor_pos(cursor)
 
+    def release_textures(self):
+        """
+        Release every Texture in self.textures, called by the backend when
+        the window closes while its GL context is current.
+        """
+        from uxceptional.textures import Texture, TextureManager # Loads GL, see __init__
+        for texture in self.textures.values():
+            if isinstance(texture, Texture):
+                TextureManager.release(texture)
+        self.textures = {}
 
+    def request_redraw(self, frames=1):
+        """
+        Ask the backend to draw at least `frames` more frames of this window.
+        Safe to call from any thread, wakes the backend if it is idle.
+        """
+        self.redraw_frames = max(self.redraw_frames, frames)
+        self.frame_key = None
+        if self.state.window_id is not None:
+            import glfw # Loaded by the backend that created the window
+            glfw.post_empty_event()
 
-    def _data_thread(self):
+    def frame_unchanged(self, frame_key, settle_frames=1):
         """
-        Runner function for data thread
-        uses asyncio for single thread concurrency where possible
+        True if the previous frame can be shown again instead of building
+        one for frame_key. imgui needs a few frames to settle hover and
+        layout state, so a key is only reused after settle_frames builds.
         """
-        while True:
-            asyncio.run(self.update_data(self.data))
-            sleep(self.data['refresh_period'])
+        if not self.retained or self.animating:
+            self.frame_key = None
+            return False
+        if frame_key != self.frame_key:
+            self.frame_key = frame_key
+            self.frame_builds = 1
+            return False
+        if self.frame_builds < settle_frames:
+            self.frame_builds += 1
+            return False
+        return True
 
     @abstractmethod
     def set_theme(self):
@@ -130,14 +213,64 @@ class WindowBase:
     
     def run_create_window(self):
         if not self.initialized:
-            asyncio.run(self._init())
+            self._init()
             self.initialized = True
         if self.raise_if_no_data_thread: # default
-            if not self.data_thread.is_alive():
+            if not DataScheduler.is_alive():
                 raise DataThreadFailedException("Data thread unexpectedly vanished")
 
+        self.last_generation = self.frame_generation
+        self.frame_generation = self.data.generation
+        self.apply_theme()
         self.create_window()
 
+    def layout_key(self):
+        """
+        Everything the measured content size depends on, see ShellWindow.init.
+        None measures every frame, as for animating windows and windows
+        drawing anything not in self.data. Override to add inputs of your own
+        """
+        if self.animating or not self.retained:
+            return None
+        return (self.data.generation, self.theme_key(), Monitors.generation)
+
+    def theme_key(self):
+        """
+        Identifies the theme and its version, changes when it has to be applied
+        """
+        theme = self.theme
+        if theme is None:
+            return None
+        return (id(theme), theme.version)
+
+    def apply_theme(self):
+        """
+        Apply self.theme to the current imgui context if it changed,
+        on top of the style the context had before any theme
+        """
+        theme_key = self.theme_key()
+        if theme_key == self.applied_theme:
+            return
+        if self.base_style is None:
+            self.base_style = snapshot_style()
+        else:
+            restore_style(self.base_style)
+        if self.theme is not None:
+            self.theme.apply()
+        self.applied_theme = theme_key
+
+    def data_changed(self, key):
+        """
+        True if self.data[key] changed since the previous frame
+        """
+        return self.data.changed_since(key, self.last_generation)
+
+    def data_stale(self, key):
+        """
+        True if self.data[key] was restored from data_cache and not fetched yet
+        """
+        return self.data.is_stale(key)
+
     @abstractmethod
     def create_window(self):
         """
@@ -148,25 +281,48 @@ class WindowBase:
         pass
 
 
-    async def update_data(self, data):
+    async def update_data(self, data, fetchers):
+        """
+        Async data update coroutine, run on the DataScheduler loop
+        with the fetchers that are due.
+        All fetchers run at once and each result is written as soon as it
+        arrives, but the function won't return until all of them are
+        complete or timed out.
+        """
+        results = await asyncio.gather(
+            *(run_fetcher(self, data, fet) for fet in fetchers),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                traceback.print_exception(result)
+
+    def publish(self, key, value, data=None):
         """
-        Async data update coroutine
-        Building with async means multiple actions can execute at once
-        but the function won't return until all of them are complete.
+        Store a fetched value and request a redraw if it changed
+
+        Returns:
+            bool: True if the value changed
         """
-        with self.thread_lock:
-            timestamps = self.data["timestamps"]
-            for fet in self.fetchers:
-                fet = fet # type: DataFetcher
-                due = False
-                now = datetime.utcnow()
-                if fet.key not in timestamps:
-                    due = True
-                elif (now - timestamps[fet.key]).total_seconds() > (fet.delay / 1000.0):
-                    due = True
+        if data is None:
+            data = self.data
+        if data.publish(key, value):
+            self.request_redraw()
+            if self.data_cache is not None and data is self.data and self.data_cache.due():
+                self.save_data_cache()
+            return True
+        return False
 
-                if due:
-                    timestamps[fet.key] = datetime.utcnow()
-                    data[fet.key] = await fet.function(data)
+    def set_visible(self, visible):
+        """
+        Called by the backend when the window is shown or hidden.
+        Paused fetchers (see DataFetcher pause_hidden) resume once visible.
+        """
+        if visible == self.visible:
+            return
+        self.visible = visible
+        if visible:
+            DataScheduler.resume(self)
+            self.request_redraw()
 
 